@@ -1,12 +1,20 @@
+import asyncio
 import subprocess
 import re
 import os
+import sys
+import time
+import uuid
 from typing import List, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
-from groq import Groq
+from frontend import create_frontend_router
+from tools import describe_tool_call, run_tool_calls, tool_result_message, tool_schemas
+from optimizer import build_optimization_prompt, compare_runs, measure, profile_code
+from providers import AllEndpointsFailed, RequestTimeout, get_default_pool
+from workspace import Workspace
 
 load_dotenv()
 
@@ -14,6 +22,42 @@ load_dotenv()
 class TaskRequest(BaseModel):
     task: str
     debug: bool = False
+    # Budgets, enforced across the plan, code generation and fix phases (None = unlimited)
+    max_tokens: Optional[int] = None
+    max_wall_time: Optional[float] = None  # seconds
+    max_llm_calls: Optional[int] = None
+    max_cost: Optional[float] = None  # USD, estimated from MODEL_PRICES
+    # Profile successful code and keep a faster rewrite if it is equivalent and measurably better
+    optimize: bool = False
+    # Run every attempt in its own workspace layer; failed attempts are dropped, successful ones
+    # committed, and the result is written back to the working directory when the task ends
+    isolate: bool = True
+
+class Usage(BaseModel):
+    llm_calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    total_tokens: int = 0
+    cost: float = 0.0
+    wall_time: float = 0.0
+
+    def add(self, other):
+        self.llm_calls += other.llm_calls
+        self.prompt_tokens += other.prompt_tokens
+        self.completion_tokens += other.completion_tokens
+        self.total_tokens += other.total_tokens
+        self.cost = round(self.cost + other.cost, 6)
+        self.wall_time = round(self.wall_time + other.wall_time, 3)
+
+class OptimizationResult(BaseModel):
+    accepted: bool
+    reason: str
+    original_wall_time: Optional[float] = None
+    original_peak_rss_kb: Optional[int] = None
+    optimized_wall_time: Optional[float] = None
+    optimized_peak_rss_kb: Optional[int] = None
+    hotspots: List[str] = []
+    code: Optional[str] = None
 
 class SubtaskResponse(BaseModel):
     description: str
@@ -21,21 +65,94 @@ class SubtaskResponse(BaseModel):
     output: Optional[str] = None
     error: Optional[str] = None
     attempts: int = 0
+    usage: Usage = Field(default_factory=Usage)
+    optimization: Optional[OptimizationResult] = None
 
 class TaskResponse(BaseModel):
     task_id: str
     status: str
     subtasks: List[SubtaskResponse]
     final_output: Optional[str] = None
+    usage: Usage = Field(default_factory=Usage)
+    stop_reason: Optional[str] = None
 
 MAX_TRIES = 3
+MAX_COMPLETION_TOKENS = 1024
+# Code that finishes faster than this is not worth an extra LLM call to optimize
+OPTIMIZE_MIN_WALL_TIME = 0.5
+# USD per million (prompt, completion) tokens, used for the max_cost budget and usage.cost.
+# A "price" in an LLM_ENDPOINTS entry takes precedence
+MODEL_PRICES = {
+    "qwen-2.5-coder-32b": (0.79, 0.79),
+    "qwen-2.5-32b": (0.79, 0.79),
+}
+
+class BudgetExceeded(Exception):
+    pass
+
+class InvalidResponse(Exception):
+    pass
+
+# Built-in transcription tool, exposed to generated code as a plain command
+TRANSCRIBE_COMMAND = f"{sys.executable} {os.path.join(os.path.dirname(os.path.abspath(__file__)), 'transcribe.py')}"
+
 class AIAgent:
-    def __init__(self, debug=False):
+    def __init__(self, debug=False, max_tokens=None, max_wall_time=None, max_llm_calls=None, max_cost=None,
+                 optimize=False, isolate=True, workspace_exclude=()):
         self.history = []
         self.debug = debug
+        self.optimize = optimize
+        self.isolate = isolate
+        self.workspace_exclude = workspace_exclude
+        self.workspace = None
+        # Where generated code and tools run: the current attempt's layer, or the working directory
+        self.workdir = None
         self.subtasks = []
         self.current_subtask = 0
-        self.client = Groq(api_key=os.environ.get("GROQ_API_KEY"))
+        self.pending_tool_calls = []
+        self.client = get_default_pool()
+        self.max_tokens = max_tokens
+        self.max_wall_time = max_wall_time
+        self.max_llm_calls = max_llm_calls
+        self.max_cost = max_cost
+        if max_cost is not None:
+            # An unpriced model would cost $0 and the budget would never trigger
+            unpriced = sorted({model for model, price in self.client.models(debug)
+                               if price is None and model not in MODEL_PRICES})
+            if unpriced:
+                raise ValueError(f"max_cost needs a price for {', '.join(unpriced)}; "
+                                 f"set \"price\" in its LLM_ENDPOINTS entry")
+        self.usage = Usage()
+        self.subtask_results = []
+        self.started_at = time.perf_counter()
+
+    def remaining_time(self):
+        if self.max_wall_time is None:
+            return None
+        return self.max_wall_time - (time.perf_counter() - self.started_at)
+
+    def check_budget(self, llm_call=True):
+        """Raise BudgetExceeded before starting more work once any budget is used up.
+
+        Running already generated code only needs wall time, so llm_call=False skips the LLM budgets.
+        """
+        remaining = self.remaining_time()
+        if remaining is not None and remaining <= 0:
+            raise BudgetExceeded(f"max_wall_time of {self.max_wall_time}s exceeded")
+        if not llm_call:
+            return
+        if self.max_llm_calls is not None and self.usage.llm_calls >= self.max_llm_calls:
+            raise BudgetExceeded(f"max_llm_calls of {self.max_llm_calls} reached")
+        if self.max_tokens is not None and self.usage.total_tokens >= self.max_tokens:
+            raise BudgetExceeded(f"max_tokens of {self.max_tokens} reached ({self.usage.total_tokens} used)")
+        if self.max_cost is not None and self.usage.cost >= self.max_cost:
+            raise BudgetExceeded(f"max_cost of ${self.max_cost} reached (${self.usage.cost:.4f} spent)")
+
+    def record_usage(self, usage):
+        self.usage.add(usage)
+        # The planning call happens before subtasks exist and only counts towards the task
+        if self.current_subtask < len(self.subtask_results):
+            self.subtask_results[self.current_subtask].usage.add(usage)
 
     def generate_initial_prompt(self, task):
         return [
@@ -62,21 +179,64 @@ Code:
 
 
 NOTE : Always prefer to perform an action using subprocess module if possible. If not, then use other Python code.
-Always return some code. Never return a blank/null response
+Always return some code (or tool calls). Never return a blank/null response
+
+TOOLS : When a subtask is a trivial action (write a file, run a shell command, install packages, fetch a URL,
+check a port, transcribe audio), call the provided tools instead of writing code. You may call several tools
+in one response, they run in order and stop at the first failure.
+If generated code needs to transcribe audio, run the built-in tool instead of writing transcription code:
+{TRANSCRIBE_COMMAND} <audio file> -o <output text file>
 ```"""}
         ]
 
     def request_ai(self, messages):
-        model = "qwen-2.5-coder-32b" if not self.debug else "qwen-2.5-32b"
-        response = self.client.chat.completions.create(
-            messages=messages,
-            model=model,
-            temperature=0,            # Adjust temperature or other parameters as needed.
-            max_completion_tokens=1024  # Adjust token limits if necessary.
-        )
+        self.check_budget()
+        max_completion_tokens = MAX_COMPLETION_TOKENS
+        if self.max_tokens is not None:
+            # Never let a single completion overshoot the remaining token budget
+            max_completion_tokens = max(1, min(max_completion_tokens, self.max_tokens - self.usage.total_tokens))
+        start = time.perf_counter()
+        timeout = self.remaining_time()
+        try:
+            # Streams from the endpoint with the fastest first tokens, hedging to another one if no token arrives in time
+            message = self.client.complete(
+                messages,
+                debug=self.debug,
+                timeout=timeout,
+                temperature=0,            # Adjust temperature or other parameters as needed.
+                max_completion_tokens=max_completion_tokens,  # Adjust token limits if necessary.
+                tools=tool_schemas(),
+                tool_choice="auto",
+            )
+        except RequestTimeout as e:
+            # The request was sent and may be billed even though no answer came back in time
+            self.record_usage(self.llm_usage(e.usage, start))
+            if timeout is not None:
+                raise BudgetExceeded(f"max_wall_time of {self.max_wall_time}s exceeded waiting for the LLM") from e
+            raise
+        if message.hedged:
+            print(f"Hedged request answered by {message.endpoint} ({message.model}) in {message.latency:.2f}s")
+        # Cancelled hedge attempts were billed too, so they count towards max_tokens/max_cost
+        self.record_usage(self.llm_usage([(message.model, message.price, message.usage)] + message.hedge_usage, start))
+        # Structured tool calls are run in-process by run_task instead of extracting code
+        self.pending_tool_calls = message.tool_calls
         # Extract and return the content from the first choice.
-        return response.choices[0].message.content
-
+        return message.content or ""
+
+
+    def llm_usage(self, attempts, start):
+        """Usage of one LLM call from its (model, endpoint price, CompletionUsage) attempts."""
+        usage = Usage(llm_calls=1, wall_time=round(time.perf_counter() - start, 3))
+        for model, price, counts in attempts:
+            if counts is None:
+                continue
+            prompt_price, completion_price = price or MODEL_PRICES.get(model, (0.0, 0.0))
+            usage.prompt_tokens += counts.prompt_tokens
+            usage.completion_tokens += counts.completion_tokens
+            usage.total_tokens += counts.total_tokens
+            usage.cost = round(usage.cost + (counts.prompt_tokens * prompt_price
+                                             + counts.completion_tokens * completion_price) / 1e6, 6)
+        return usage
 
     def extract_code_from_response(self, response):
         code_match = re.search(r'```python\n(.*?)\n```', response, re.DOTALL)
@@ -91,7 +251,9 @@ Always return some code. Never return a blank/null response
             result = subprocess.run(['python3', '-c', code],
                                     capture_output=True,
                                     text=True,
-                                    check=True)
+                                    check=True,
+                                    timeout=self.remaining_time(),
+                                    cwd=self.workdir)
             return {
                 "success": True,
                 "output": result.stdout,
@@ -103,6 +265,93 @@ Always return some code. Never return a blank/null response
                 "output": None,
                 "error": f"{e.stderr}\nExit code: {e.returncode}"
             }
+        except subprocess.TimeoutExpired:
+            return {
+                "success": False,
+                "output": None,
+                "error": f"Killed: max_wall_time of {self.max_wall_time}s exceeded"
+            }
+
+    def execute_tool_calls(self, content):
+        tool_calls = self.pending_tool_calls
+        self.pending_tool_calls = []
+        # The assistant turn and one tool message per call must be in history for the next request
+        self.history.append({
+            "role": "assistant",
+            "content": content,
+            "tool_calls": [
+                {"id": call.id, "type": "function",
+                 "function": {"name": call.function.name, "arguments": call.function.arguments}}
+                for call in tool_calls
+            ],
+        })
+        results = run_tool_calls(tool_calls, self.remaining_time(), cwd=self.workdir)
+        for call, result in results:
+            print(f"Tool call {describe_tool_call(call)} -> {'ok' if result['success'] else 'failed'}")
+            self.history.append(tool_result_message(call, result))
+        for call in tool_calls[len(results):]:
+            self.history.append({"role": "tool", "tool_call_id": call.id,
+                                 "content": "Skipped because an earlier tool call failed"})
+
+        failed = [result for _, result in results if not result["success"]]
+        return {
+            "success": not failed,
+            "output": "\n".join(str(result["output"]) for _, result in results if result["success"]),
+            "error": failed[0]["error"] if failed else None,
+        }
+
+    def optimize_code(self, code):
+        """Profile working code, ask the model for a faster version and keep it only if it provably wins."""
+        result = OptimizationResult(accepted=False, reason="")
+        try:
+            self.check_budget(llm_call=False)
+            # Every re-run below shares the task's remaining wall time
+            baseline = measure(code, timeout=300, time_limit=self.remaining_time(), cwd=self.workdir)
+            self.check_budget(llm_call=False)
+            if not baseline["success"]:
+                result.reason = f"Could not re-run the original code: {baseline['error'][-500:]}"
+                return result
+            result.original_wall_time = round(baseline["wall_time"], 4)
+            result.original_peak_rss_kb = baseline["peak_rss_kb"]
+            if baseline["wall_time"] < OPTIMIZE_MIN_WALL_TIME:
+                result.reason = f"Already fast ({baseline['wall_time']:.3f}s)"
+                return result
+
+            profile = profile_code(code, timeout=self.capped_timeout(baseline["wall_time"] * 10 + 30), cwd=self.workdir)
+            self.check_budget(llm_call=False)
+            if profile is None:
+                result.reason = "Profiling failed"
+                return result
+            result.hotspots = [h["function"] for h in profile["hotspots"][:5]]
+            try:
+                response = self.request_ai(build_optimization_prompt(code, profile, baseline))
+            finally:
+                # Tool calls make no sense here and must not leak into the next subtask
+                self.pending_tool_calls = []
+            optimized_code = self.extract_code_from_response(response)
+            if not optimized_code:
+                result.reason = "No code found in optimization response"
+                return result
+
+            self.check_budget(llm_call=False)
+            candidate = measure(optimized_code, timeout=baseline["wall_time"] * 3 + 5,
+                                time_limit=self.remaining_time(), cwd=self.workdir)
+            self.check_budget(llm_call=False)
+        except BudgetExceeded as e:
+            result.reason = f"Skipped: {e}"
+            return result
+        result.accepted, result.reason = compare_runs(baseline, candidate)
+        if candidate["success"]:
+            result.optimized_wall_time = round(candidate["wall_time"], 4)
+            result.optimized_peak_rss_kb = candidate["peak_rss_kb"]
+        if result.accepted:
+            result.code = optimized_code
+        print(f"Optimization {'accepted' if result.accepted else 'rejected'}: {result.reason}")
+        return result
+
+    def capped_timeout(self, timeout):
+        remaining = self.remaining_time()
+        return timeout if remaining is None else max(0.0, min(timeout, remaining))
 
     def handle_error(self, code, error):
         debug_prompt = {
@@ -135,6 +384,18 @@ NOTE : Always prefer to perform an action using bash commands if possible. If no
         self.history.append(debug_prompt)
         return self.request_ai(self.history)
 
+    def handle_tool_error(self, error):
+        # The failed call and its error are already in history as tool messages, no code to show
+        self.history.append({
+            "role": "user",
+            "content": f"""The tool call failed with error:
+{error}
+
+Fix the problem and retry: call the tools again with corrected arguments, or, if a tool cannot do this,
+return Python code in a ```python block instead. Do not call tool names from Python code."""
+        })
+        return self.request_ai(self.history)
+
     def process_subtasks(self, response):
         subtask_section = re.search(
             r'Subtasks:\n(.*?)\n\n', response, re.DOTALL)
@@ -144,28 +405,115 @@ NOTE : Always prefer to perform an action using bash commands if possible. If no
             self.subtasks = subtasks
             self.current_subtask = 0
 
+    def begin_attempt(self):
+        if self.workspace is not None:
+            self.workdir = self.workspace.begin()
+
+    def commit_attempt(self):
+        if self.workspace is not None:
+            self.workspace.commit()
+            self.workdir = None
+
+    def drop_attempt(self):
+        if self.workspace is not None:
+            self.workspace.drop()
+            self.workdir = None
+
     def run_task(self, task):
+        self.started_at = time.perf_counter()
+        self.usage = Usage()
+        self.subtask_results = []
+        stop_reason = None
+        if self.isolate:
+            self.workspace = Workspace(exclude=self.workspace_exclude)
+        try:
+            self.run_subtasks(task)
+        except (BudgetExceeded, AllEndpointsFailed, InvalidResponse) as e:
+            # Stop early but keep everything completed so far
+            if isinstance(e, BudgetExceeded):
+                stop_reason = f"Budget exceeded: {e}"
+            elif isinstance(e, AllEndpointsFailed):
+                stop_reason = f"LLM unavailable: {e}"
+            else:
+                stop_reason = f"Invalid AI response: {e}"
+            print(stop_reason)
+            if self.current_subtask < len(self.subtask_results):
+                current = self.subtask_results[self.current_subtask]
+                current.status = "failed"
+                current.error = current.error or stop_reason
+        finally:
+            if self.workspace is not None:
+                # Completed subtasks are kept even when the task stops early
+                self.workspace.apply()
+                self.workspace.close()
+                self.workspace = self.workdir = None
+        self.usage.wall_time = round(time.perf_counter() - self.started_at, 3)
+
+        completed = [s for s in self.subtask_results if s.status == "completed"]
+        if stop_reason is None and len(completed) < len(self.subtask_results):
+            stop_reason = f"Gave up after {MAX_TRIES} failed attempts"
+            self.subtask_results[self.current_subtask].status = "failed"
+        return TaskResponse(
+            task_id=str(uuid.uuid4()),
+            status="completed" if stop_reason is None else "failed",
+            subtasks=self.subtask_results,
+            final_output=completed[-1].output if completed else None,
+            usage=self.usage,
+            stop_reason=stop_reason,
+        )
+
+    def run_subtasks(self, task):
         tries_count = 0
         self.history = self.generate_initial_prompt(task)
         response = self.request_ai(self.history)
         print(f"Initial response:\n{response}")
 
         self.process_subtasks(response)
+        if not self.subtasks and (self.pending_tool_calls or self.extract_code_from_response(response)):
+            # A task handled entirely by tool calls (or one code block) may come back without a subtask list
+            self.subtasks = [task]
+            self.current_subtask = 0
+        if not self.subtasks:
+            raise InvalidResponse("No subtasks or code found in the AI response")
+        self.subtask_results = [SubtaskResponse(description=s, status="pending") for s in self.subtasks]
 
         while self.current_subtask < len(self.subtasks) and tries_count < MAX_TRIES:
             print(
                 f"\nProcessing subtask {self.current_subtask+1}/{len(self.subtasks)}: {self.subtasks[self.current_subtask]}")
+            self.check_budget(llm_call=False)
+            subtask_result = self.subtask_results[self.current_subtask]
+            subtask_result.status = "in_progress"
+            subtask_result.attempts += 1
+            start = time.perf_counter()
+
+            code_from_tools = bool(self.pending_tool_calls)
+            self.begin_attempt()
+            if code_from_tools:
+                # Fast path: no code generation round-trip and no python3 -c process
+                code = "\n".join(describe_tool_call(call) for call in self.pending_tool_calls)
+                execution_result = self.execute_tool_calls(response)
+            else:
+                code = self.extract_code_from_response(response)
+                if not code:
+                    raise InvalidResponse("No code found in AI response")
 
-            code = self.extract_code_from_response(response)
-            if not code:
-                raise ValueError("No code found in AI response")
-
-            execution_result = self.execute_code(code)
+                execution_result = self.execute_code(code)
+            subtask_result.usage.wall_time = round(subtask_result.usage.wall_time + time.perf_counter() - start, 3)
 
             if execution_result['success']:
                 print(
                     f"Subtask {self.current_subtask+1} completed successfully!")
                 print(f"Output: {execution_result['output']}")
+                subtask_result.status = "completed"
+                subtask_result.output = execution_result['output']
+                subtask_result.error = None
+                self.commit_attempt()
+                if self.optimize and not code_from_tools:
+                    # Profiling re-runs the code several times (and the rewrite too) in a scratch
+                    # layer; the state committed after the original run is the one to keep
+                    self.begin_attempt()
+                    subtask_result.optimization = self.optimize_code(code)
+                    self.drop_attempt()
                 self.current_subtask += 1
                 if self.current_subtask < len(self.subtasks):
                     next_subtask = self.subtasks[self.current_subtask]
@@ -178,15 +526,25 @@ NOTE : Always prefer to perform an action using bash commands if possible. If no
             else:
                 print(f"Error in subtask {self.current_subtask+1}:")
                 print(execution_result['error'])
-                debug_response = self.handle_error(
-                    code, execution_result['error'])
+                subtask_result.error = execution_result['error']
+                # The next attempt starts from the last good state, not from what this one left behind
+                self.drop_attempt()
+                # A run killed by max_wall_time is a budget stop, not something to ask the model to fix
+                self.check_budget(llm_call=False)
+                tries_count+=1
+                if tries_count >= MAX_TRIES:
+                    break
+                if code_from_tools:
+                    debug_response = self.handle_tool_error(execution_result['error'])
+                else:
+                    debug_response = self.handle_error(code, execution_result['error'])
                 print("\nDebugging response:")
                 print(debug_response)
                 response = debug_response
-                self.history.append(
-                    {"role": "assistant", "content": debug_response})
-                tries_count+=1
-        return "All tasks completed successfully!"
+                if not self.pending_tool_calls:
+                    # Tool call turns are recorded by execute_tool_calls together with their results
+                    self.history.append(
+                        {"role": "assistant", "content": debug_response})
 
 # FastAPI application
 app = FastAPI(title="AI Agent API")
@@ -203,15 +561,29 @@ app.add_middleware(
 @app.post("/api/task", response_model=TaskResponse)
 async def create_task(task_request: TaskRequest):
     try:
-        agent = AIAgent(debug=task_request.debug)
-        result = await agent.run_task(task_request.task)
+        agent = AIAgent(debug=task_request.debug,
+                        max_tokens=task_request.max_tokens,
+                        max_wall_time=task_request.max_wall_time,
+                        max_llm_calls=task_request.max_llm_calls,
+                        max_cost=task_request.max_cost,
+                        optimize=task_request.optimize,
+                        isolate=task_request.isolate)
+    except ValueError as e:
+        # A budget that cannot be enforced, e.g. max_cost with an unpriced model
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        # run_task blocks on the LLM and subprocesses, keep it off the event loop
+        result = await asyncio.to_thread(agent.run_task, task_request.task)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/")
-async def root():
-    return {"message": "AI Agent API is running"}
+@app.get("/health")
+async def health():
+    return {"status": "healthy", "llm_endpoints": get_default_pool().health()}
+
+# The UI is served from this same process, assets are prebuilt by build_static.py
+app.include_router(create_frontend_router())
 
 if __name__ == "__main__":
     import uvicorn
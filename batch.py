@@ -0,0 +1,166 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import statistics
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from backend import AIAgent, TaskRequest
+
+BUDGET_FIELDS = ('max_tokens', 'max_wall_time', 'max_llm_calls', 'max_cost')
+# Status of a task whose worker process died; it never finished, so --resume runs it again
+CRASHED = 'crashed'
+
+
+def load_tasks(path):
+    """Read tasks from JSONL (one object or string per line) or YAML (a list, or {"tasks": [...]}).
+
+    Besides the TaskRequest fields an entry may have an "id" and "files", input files (relative
+    to the task file) that are copied into the task's working directory before it runs.
+    """
+    if path.endswith(('.yaml', '.yml')):
+        import yaml
+        with open(path) as f:
+            data = yaml.safe_load(f) or []
+        entries = data.get('tasks', []) if isinstance(data, dict) else data
+    else:
+        with open(path) as f:
+            entries = [json.loads(line) for line in f if line.strip() and not line.lstrip().startswith('#')]
+
+    base_dir = os.path.dirname(os.path.abspath(path))
+    tasks = []
+    seen = set()
+    for index, entry in enumerate(entries):
+        if isinstance(entry, str):
+            entry = {'task': entry}
+        # Stable ids are what makes --resume work when the file is edited or reordered
+        task_id = str(entry.pop('id', None) or f"{index:04d}-{hashlib.sha1(entry['task'].encode()).hexdigest()[:8]}")
+        if task_id in seen:
+            raise ValueError(f"Duplicate task id '{task_id}' in {path}")
+        seen.add(task_id)
+        files = [os.path.join(base_dir, f) for f in entry.pop('files', [])]
+        tasks.append((task_id, TaskRequest(**entry), files))
+    return tasks
+
+
+def completed_ids(output_path):
+    if not os.path.exists(output_path):
+        return set()
+    done = set()
+    with open(output_path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                if record['status'] != CRASHED:
+                    done.add(record['id'])
+            except (ValueError, KeyError):
+                continue  # a line cut short by a crash is simply re-run
+    return done
+
+
+def run_one(task_id, request_data, workdir, files=()):
+    """Worker entry point: run one task in its own directory with its own log file."""
+    request = TaskRequest(**request_data)
+    os.makedirs(workdir, exist_ok=True)
+    for path in files:
+        shutil.copy2(path, workdir)
+    # Each worker is a separate process, so chdir and stdout redirection only affect this task
+    os.chdir(workdir)
+    started = time.time()
+    start = time.perf_counter()
+    record = {'id': task_id, 'task': request.task, 'workdir': workdir, 'started_at': started}
+    with open('agent.log', 'w') as log:
+        sys.stdout = sys.stderr = log
+        try:
+            # agent.log is written by this process, not by the task, so it is never layered
+            agent = AIAgent(debug=request.debug, optimize=request.optimize, isolate=request.isolate,
+                            workspace_exclude=('agent.log',),
+                            **{field: getattr(request, field) for field in BUDGET_FIELDS})
+            result = agent.run_task(request.task)
+            record.update(status=result.status, stop_reason=result.stop_reason,
+                          usage=result.usage.model_dump(), result=result.model_dump())
+        except Exception as e:
+            traceback.print_exc()
+            record.update(status='error', error=f"{type(e).__name__}: {e}")
+        finally:
+            sys.stdout, sys.stderr = sys.__stdout__, sys.__stderr__
+    record['elapsed'] = round(time.perf_counter() - start, 3)
+    return record
+
+
+def run_batch(tasks, output_path, workers=4, workdir_root='batch_runs', resume=False, defaults=None):
+    done = completed_ids(output_path) if resume else set()
+    pending = [task for task in tasks if task[0] not in done]
+    print(f"{len(tasks)} tasks, {len(tasks) - len(pending)} already done, running {len(pending)} "
+          f"with {workers} workers")
+
+    records = []
+    start = time.perf_counter()
+    mode = 'a' if resume else 'w'
+    with open(output_path, mode) as output, ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        for task_id, request, files in pending:
+            data = request.model_dump()
+            for field, value in (defaults or {}).items():
+                if data.get(field) is None:
+                    data[field] = value
+            workdir = os.path.abspath(os.path.join(workdir_root, task_id))
+            futures[pool.submit(run_one, task_id, data, workdir, files)] = (task_id, request)
+
+        for future in as_completed(futures):
+            task_id, request = futures[future]
+            try:
+                record = future.result()
+            except Exception as e:
+                # The worker process died (which breaks the pool for every pending task too); the
+                # task is recorded for the summary but not as done, so --resume runs it again
+                record = {'id': task_id, 'task': request.task, 'status': CRASHED, 'error': f"{type(e).__name__}: {e}"}
+            # One flushed line per finished task, so an interrupted batch can be resumed
+            output.write(json.dumps(record) + '\n')
+            output.flush()
+            os.fsync(output.fileno())
+            records.append(record)
+            print(f"[{len(records)}/{len(pending)}] {task_id}: {record['status']} "
+                  f"({record.get('elapsed', 0):.1f}s, {record.get('usage', {}).get('total_tokens', 0)} tokens)")
+
+    elapsed = time.perf_counter() - start
+    summarize(records, elapsed)
+    return records
+
+
+def summarize(records, elapsed):
+    if not records:
+        print("Nothing to run")
+        return
+    statuses = {}
+    for record in records:
+        statuses[record['status']] = statuses.get(record['status'], 0) + 1
+    durations = [r['elapsed'] for r in records if 'elapsed' in r]
+    tokens = sum(r.get('usage', {}).get('total_tokens', 0) for r in records)
+    print(f"\nFinished {len(records)} tasks in {elapsed:.1f}s ({len(records) / elapsed * 60:.1f} tasks/min)")
+    print("Status: " + ", ".join(f"{status} {count}" for status, count in sorted(statuses.items())))
+    if durations:
+        print(f"Task time: median {statistics.median(durations):.1f}s, max {max(durations):.1f}s")
+    print(f"Tokens: {tokens}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run a file of agent tasks without the API server')
+    parser.add_argument('tasks', help='JSONL or YAML task file')
+    parser.add_argument('-o', '--output', default='batch_results.jsonl', help='JSONL results file')
+    parser.add_argument('-w', '--workers', type=int, default=4)
+    parser.add_argument('--workdir', default='batch_runs', help='each task runs in <workdir>/<task id>/')
+    parser.add_argument('--resume', action='store_true', help='skip tasks already present in the output file')
+    for field in BUDGET_FIELDS:
+        value_type = int if field in ('max_tokens', 'max_llm_calls') else float
+        parser.add_argument(f"--{field.replace('_', '-')}", dest=field, type=value_type,
+                            help=f"default {field} for tasks that do not set one")
+    args = parser.parse_args()
+
+    defaults = {field: getattr(args, field) for field in BUDGET_FIELDS if getattr(args, field) is not None}
+    records = run_batch(load_tasks(args.tasks), args.output, args.workers, args.workdir, args.resume, defaults)
+    sys.exit(0 if all(r['status'] == 'completed' for r in records) else 1)
@@ -0,0 +1,114 @@
+import argparse
+import gzip
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Only advertise what this client can decode, the HTML body is parsed for asset URLs
+ACCEPT_ENCODING = 'br, gzip' if brotli is not None else 'gzip'
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def fetch(url, headers=None):
+    req = urllib.request.Request(url, headers=headers or {})
+    try:
+        with urllib.request.urlopen(req) as resp:
+            return resp.status, resp.headers, resp.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers, b''
+
+
+def decode_body(headers, body):
+    encoding = headers.get('Content-Encoding')
+    if encoding == 'gzip':
+        return gzip.decompress(body)
+    if encoding == 'br':
+        return brotli.decompress(body)
+    return body
+
+
+def start_server(port):
+    """Launch the app in a fresh interpreter and return (process, seconds until /health answers)."""
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'backend:app', '--port', str(port), '--log-level', 'warning'])
+    while True:
+        try:
+            status, _, _ = fetch(f'http://127.0.0.1:{port}/health')
+            if status == 200:
+                return proc, time.perf_counter() - start
+        except (urllib.error.URLError, ConnectionError):
+            pass
+        if proc.poll() is not None:
+            raise RuntimeError('Server exited during startup')
+        time.sleep(0.01)
+
+
+def page_load(base, etags=None):
+    """Fetch index.html and every asset it references, like a browser would."""
+    headers = {'Accept-Encoding': ACCEPT_ENCODING}
+    etags = etags if etags is not None else {}
+    transferred = 0
+    start = time.perf_counter()
+
+    status, resp_headers, body = fetch(base + '/', dict(headers, **({'If-None-Match': etags['/']} if '/' in etags else {})))
+    transferred += len(body)
+    etags['/'] = resp_headers.get('ETag')
+    if status == 200:
+        etags['assets'] = re.findall(r'(/static/[^"]+)', decode_body(resp_headers, body).decode())
+    for path in etags.get('assets', []):
+        # Fingerprinted assets are immutable, a warm browser would not request them at all
+        if path in etags:
+            continue
+        status, resp_headers, body = fetch(base + path, headers)
+        transferred += len(body)
+        etags[path] = resp_headers.get('ETag')
+    return time.perf_counter() - start, transferred, etags
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure frontend cold start and page load time')
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    cold_starts, cold_loads, warm_loads = [], [], []
+    cold_bytes = warm_bytes = 0
+    for _ in range(args.runs):
+        port = free_port()
+        proc, startup = start_server(port)
+        try:
+            base = f'http://127.0.0.1:{port}'
+            elapsed, cold_bytes, etags = page_load(base)
+            cold_starts.append(startup)
+            cold_loads.append(elapsed)
+            elapsed, warm_bytes, _ = page_load(base, etags)
+            warm_loads.append(elapsed)
+        finally:
+            proc.terminate()
+            proc.wait()
+
+    def ms(values):
+        return f"median {statistics.median(values) * 1000:.1f} ms, max {max(values) * 1000:.1f} ms"
+
+    print(f"Cold start (process spawn -> /health):  {ms(cold_starts)}")
+    print(f"First page load ({cold_bytes} bytes):      {ms(cold_loads)}")
+    print(f"Repeat page load ({warm_bytes} bytes):       {ms(warm_loads)}")
+
+
+if __name__ == '__main__':
+    main()
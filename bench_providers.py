@@ -0,0 +1,76 @@
+import argparse
+import statistics
+import time
+
+from llm_standin import StandinLLM
+from providers import AllEndpointsFailed, Endpoint, ProviderPool
+
+MESSAGES = [{"role": "user", "content": "Say hello"}]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def run(pool, requests):
+    latencies = []
+    failures = 0
+    hedged = 0
+    for _ in range(requests):
+        start = time.perf_counter()
+        try:
+            completion = pool.complete(MESSAGES, timeout=30)
+            hedged += completion.hedged
+        except AllEndpointsFailed:
+            failures += 1
+            continue
+        latencies.append(time.perf_counter() - start)
+    return latencies, failures, hedged
+
+
+def report(name, latencies, failures, hedged, standins):
+    if latencies:
+        print(f"{name:<12} p50 {statistics.median(latencies) * 1000:7.0f}ms  p95 {percentile(latencies, 95) * 1000:7.0f}ms  "
+              f"p99 {percentile(latencies, 99) * 1000:7.0f}ms  max {max(latencies) * 1000:7.0f}ms  "
+              f"hedged {hedged}  failed {failures}")
+    for label, standin in standins:
+        print(f"{'':<12} {label}: {standin.requests} requests, {standin.completed} completed, "
+              f"{standin.errors} errors, {standin.cancelled} cancelled")
+
+
+def make_pool(standins, hedge_delay):
+    endpoints = [Endpoint(label, standin.url, "standin") for label, standin in standins]
+    return ProviderPool(endpoints, hedge_delay=hedge_delay)
+
+
+def scenario(name, requests, hedge_delay, **configs):
+    standins = [(label, StandinLLM(seed=i, **config).start()) for i, (label, config) in enumerate(configs.items())]
+    try:
+        pool = make_pool(standins, hedge_delay)
+        report(name, *run(pool, requests), standins)
+        return pool
+    finally:
+        for _, standin in standins:
+            standin.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure hedging and failover against local stand-in endpoints')
+    parser.add_argument('-n', '--requests', type=int, default=100)
+    parser.add_argument('--hedge-delay', type=float, default=0.3)
+    parser.add_argument('--slow-rate', type=float, default=0.1, help='share of primary requests that stall')
+    parser.add_argument('--slow-delay', type=float, default=2.0)
+    args = parser.parse_args()
+
+    tail = dict(first_token_delay=0.05, slow_rate=args.slow_rate, slow_delay=args.slow_delay)
+    print(f"{args.requests} requests, {args.slow_rate:.0%} of them stall for {args.slow_delay}s on the primary\n")
+
+    # Same two endpoints, hedging off (the delay can never be reached) vs on
+    scenario("no hedging", args.requests, float('inf'), primary=tail, secondary=dict(first_token_delay=0.08))
+    scenario("hedging", args.requests, args.hedge_delay, primary=tail, secondary=dict(first_token_delay=0.08))
+    # Primary returns 500 half the time, requests fail over instead of failing
+    pool = scenario("failover", args.requests, args.hedge_delay,
+                    primary=dict(error_rate=0.5), secondary=dict(first_token_delay=0.08))
+    for health in pool.health():
+        print(f"{'':<12} health {health}")
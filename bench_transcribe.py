@@ -0,0 +1,69 @@
+import argparse
+import os
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+
+from transcribe import SAMPLE_RATE, decode_to_pcm, transcribe
+
+
+def serial_baseline(path, model_name):
+    """What generated code usually does: load a model and decode the whole file in one call."""
+    import whisper
+    start = time.perf_counter()
+    model = whisper.load_model(model_name, device='cpu')
+    load_s = time.perf_counter() - start
+    start = time.perf_counter()
+    text = model.transcribe(path, fp16=False)['text'].strip()
+    return load_s, time.perf_counter() - start, text
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark serial vs chunked/parallel/cached transcription')
+    parser.add_argument('audio', nargs='*', default=['Imbatman.mp3', 'Imbatman.wav'])
+    parser.add_argument('--model', default='base')
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='concatenate the audio N times to simulate a longer recording')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for path in args.audio:
+            if args.repeat > 1:
+                # Build a longer file from the sample so chunking and parallelism have work to split
+                samples = np.asarray(decode_to_pcm(path, os.path.join(tmp_dir, 'src.pcm')))
+                gap = np.zeros(SAMPLE_RATE, dtype=np.int16)
+                long_pcm = os.path.join(tmp_dir, 'long.pcm')
+                np.concatenate([np.concatenate([samples, gap])] * args.repeat).tofile(long_pcm)
+                source = os.path.join(tmp_dir, f"long_{os.path.basename(path)}.wav")
+                subprocess.run(['ffmpeg', '-nostdin', '-v', 'error', '-y', '-f', 's16le', '-ar', str(SAMPLE_RATE),
+                                '-ac', '1', '-i', long_pcm, source], check=True)
+            else:
+                source = path
+
+            cache_dir = os.path.join(tmp_dir, 'cache')
+            load_s, serial_s, serial_text = serial_baseline(source, args.model)
+
+            start = time.perf_counter()
+            result = transcribe(source, args.model, args.workers, cache_dir=cache_dir)
+            chunked_s = time.perf_counter() - start
+
+            start = time.perf_counter()
+            cached = transcribe(source, args.model, args.workers, cache_dir=cache_dir)
+            cached_s = time.perf_counter() - start
+            assert cached['cached'] and cached['text'] == result['text']
+
+            print(f"{path} (x{args.repeat}, {result['duration_s']}s audio, {len(result['chunks'])} chunks, "
+                  f"{result['workers']} workers)")
+            print(f"  serial:          {load_s + serial_s:7.2f}s (model load {load_s:.2f}s + decode {serial_s:.2f}s)")
+            print(f"  chunked/parallel:{chunked_s:7.2f}s (ffmpeg {result['timings']['decode_s']:.2f}s, "
+                  f"workers incl. model load {result['timings']['transcribe_s']:.2f}s)")
+            print(f"  cached:          {cached_s:7.3f}s")
+            print(f"  serial text:  {serial_text[:80]!r}")
+            print(f"  chunked text: {result['text'][:80]!r}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always produced
+    brotli = None
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+
+# Files that are fingerprinted and referenced from index.html as {{ placeholder }}
+ASSETS = {
+    'style_css': 'style.css',
+    'app_js': 'app.js',
+}
+
+
+def minify_css(css):
+    # Drop comments except /*! license */ blocks, then collapse whitespace around punctuation
+    css = re.sub(r'/\*(?!!).*?\*/', '', css, flags=re.DOTALL)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    css = re.sub(r':\s+', ':', css)
+    css = css.replace(';}', '}')
+    return css.strip()
+
+
+def minify_js(js):
+    # Conservative: strip indentation, blank lines and whole-line comments only
+    lines = []
+    for line in js.splitlines():
+        line = line.strip()
+        if not line or line.startswith('//'):
+            continue
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def minify_html(html):
+    html = re.sub(r'<!--.*?-->', '', html, flags=re.DOTALL)
+    return '\n'.join(line.strip() for line in html.splitlines() if line.strip())
+
+
+def fingerprint(data):
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def write_variants(path, data):
+    """Write the file plus its precompressed siblings, return the encodings produced."""
+    with open(path, 'wb') as f:
+        f.write(data)
+    encodings = ['identity']
+    # mtime=0 keeps the .gz output byte-for-byte reproducible between builds
+    with open(path + '.gz', 'wb') as f:
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    encodings.append('gzip')
+    if brotli is not None:
+        with open(path + '.br', 'wb') as f:
+            f.write(brotli.compress(data, quality=11))
+        encodings.append('br')
+    return encodings
+
+
+def build(template_dir=TEMPLATE_DIR, static_dir=STATIC_DIR):
+    if os.path.isdir(static_dir):
+        shutil.rmtree(static_dir)
+    os.makedirs(static_dir)
+
+    manifest = {}
+    urls = {}
+    for placeholder, filename in ASSETS.items():
+        with open(os.path.join(template_dir, filename), encoding='utf-8') as f:
+            source = f.read()
+        minify = minify_css if filename.endswith('.css') else minify_js
+        data = minify(source).encode('utf-8')
+        digest = fingerprint(data)
+        stem, ext = os.path.splitext(filename)
+        hashed_name = f"{stem}.{digest}{ext}"
+        encodings = write_variants(os.path.join(static_dir, hashed_name), data)
+        manifest[hashed_name] = {'etag': digest, 'encodings': encodings, 'immutable': True}
+        urls[placeholder] = f"/static/{hashed_name}"
+        print(f"{filename} -> {hashed_name} ({len(source)} -> {len(data)} bytes)")
+
+    with open(os.path.join(template_dir, 'index.html'), encoding='utf-8') as f:
+        html = f.read()
+    for placeholder, url in urls.items():
+        html = html.replace('{{ %s }}' % placeholder, url)
+    data = minify_html(html).encode('utf-8')
+    encodings = write_variants(os.path.join(static_dir, 'index.html'), data)
+    # index.html keeps a stable name so it is revalidated on every load
+    manifest['index.html'] = {'etag': fingerprint(data), 'encodings': encodings, 'immutable': False}
+    print(f"index.html ({len(html)} -> {len(data)} bytes)")
+
+    with open(os.path.join(static_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+if __name__ == '__main__':
+    build()
@@ -0,0 +1,91 @@
+import json
+import os
+
+from fastapi import APIRouter, Request, Response
+
+from build_static import STATIC_DIR
+
+# Fingerprinted assets never change under the same name, index.html must be revalidated
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+
+MEDIA_TYPES = {
+    '.html': 'text/html; charset=utf-8',
+    '.css': 'text/css; charset=utf-8',
+    '.js': 'application/javascript; charset=utf-8',
+}
+ENCODING_SUFFIX = {'br': '.br', 'gzip': '.gz', 'identity': ''}
+
+
+def load_assets(static_dir=STATIC_DIR):
+    """Read the build output into memory once so requests never touch the disk."""
+    manifest_path = os.path.join(static_dir, 'manifest.json')
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    assets = {}
+    for name, entry in manifest.items():
+        variants = {}
+        for encoding in entry['encodings']:
+            with open(os.path.join(static_dir, name + ENCODING_SUFFIX[encoding]), 'rb') as f:
+                variants[encoding] = f.read()
+        assets[name] = {
+            'etag': entry['etag'],
+            'variants': variants,
+            'media_type': MEDIA_TYPES.get(os.path.splitext(name)[1], 'application/octet-stream'),
+            'cache_control': IMMUTABLE_CACHE if entry['immutable'] else REVALIDATE_CACHE,
+        }
+    return assets
+
+
+def choose_encoding(accept_encoding, available):
+    accepted = {token.split(';')[0].strip().lower() for token in accept_encoding.split(',')}
+    for encoding in ('br', 'gzip'):
+        if encoding in available and encoding in accepted:
+            return encoding
+    return 'identity'
+
+
+def serve_asset(asset, request):
+    encoding = choose_encoding(request.headers.get('accept-encoding', ''), asset['variants'])
+    # Each encoding is a different representation, so it gets its own strong ETag
+    etag = f'"{asset["etag"]}-{encoding}"'
+    headers = {
+        'ETag': etag,
+        'Cache-Control': asset['cache_control'],
+        'Vary': 'Accept-Encoding',
+    }
+    if_none_match = request.headers.get('if-none-match', '')
+    if etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*':
+        return Response(status_code=304, headers=headers)
+    if encoding != 'identity':
+        headers['Content-Encoding'] = encoding
+    return Response(content=asset['variants'][encoding], media_type=asset['media_type'], headers=headers)
+
+
+def create_frontend_router(static_dir=STATIC_DIR):
+    router = APIRouter()
+    assets = load_assets(static_dir)
+
+    if assets is None:
+        print(f"Frontend assets not found in {static_dir}, run `python build_static.py` to build them")
+
+        @router.get("/", include_in_schema=False)
+        async def index_missing():
+            return Response("Frontend not built. Run `python build_static.py`.", status_code=503)
+
+        return router
+
+    @router.get("/", include_in_schema=False)
+    async def index(request: Request):
+        return serve_asset(assets['index.html'], request)
+
+    @router.get("/static/{name}", include_in_schema=False)
+    async def static_asset(name: str, request: Request):
+        asset = assets.get(name)
+        if asset is None or name == 'index.html':
+            return Response(status_code=404)
+        return serve_asset(asset, request)
+
+    return router
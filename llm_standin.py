@@ -0,0 +1,140 @@
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StandinLLM:
+    """Local OpenAI-compatible /chat/completions stand-in with injectable delays and errors.
+
+    first_token_delay is the usual time to first token; with probability slow_rate it is
+    slow_delay instead, which gives the latency tail hedging is meant to cut. With probability
+    error_rate the request fails with error_status before anything is streamed.
+    """
+
+    def __init__(self, port=0, reply="print('hello')", first_token_delay=0.05, token_delay=0.005,
+                 slow_rate=0.0, slow_delay=5.0, error_rate=0.0, error_status=500, tool_call=None, seed=None):
+        self.reply = reply
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.slow_rate = slow_rate
+        self.slow_delay = slow_delay
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.tool_call = tool_call
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.completed = 0
+        self.errors = 0
+        self.cancelled = 0
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), self.make_handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+
+    def count(self, field):
+        with self.lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def chunks(self, model):
+        base = {"id": "chatcmpl-standin", "object": "chat.completion.chunk", "model": model}
+        if self.tool_call:
+            name, arguments = self.tool_call
+            # Arguments arrive in two fragments, like real streams
+            half = len(arguments) // 2
+            yield dict(base, choices=[{"index": 0, "delta": {"tool_calls": [
+                {"index": 0, "id": "call_standin", "type": "function",
+                 "function": {"name": name, "arguments": arguments[:half]}}]}}])
+            yield dict(base, choices=[{"index": 0, "delta": {"tool_calls": [
+                {"index": 0, "function": {"arguments": arguments[half:]}}]}}])
+        else:
+            for word in self.reply.split(" "):
+                yield dict(base, choices=[{"index": 0, "delta": {"content": word + " "}}])
+        yield dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}])
+        words = len(self.reply.split())
+        yield dict(base, choices=[], usage={"prompt_tokens": 10, "completion_tokens": words,
+                                            "total_tokens": 10 + words})
+
+    def make_handler(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-alive with chunked streaming, like real endpoints, so clients can reuse connections
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def write_chunk(self, data):
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                standin.count('requests')
+                with standin.lock:
+                    failing = standin.random.random() < standin.error_rate
+                    slow = standin.random.random() < standin.slow_rate
+                if failing:
+                    standin.count('errors')
+                    payload = json.dumps({"error": {"message": "injected failure"}}).encode()
+                    self.send_response(standin.error_status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                try:
+                    # Headers first, then silence until the first token, like a queued request
+                    self.wfile.flush()
+                    time.sleep(standin.slow_delay if slow else standin.first_token_delay)
+                    for chunk in standin.chunks(body.get('model', 'standin')):
+                        self.write_chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+                        time.sleep(standin.token_delay)
+                    self.write_chunk(b"data: [DONE]\n\n")
+                    self.write_chunk(b"")
+                    standin.count('completed')
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client cancelled, e.g. it was the loser of a hedged pair
+                    standin.count('cancelled')
+
+        return Handler
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve a local OpenAI-compatible stand-in for testing providers.py')
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--reply', default="```python\nprint('hello from the stand-in')\n```")
+    parser.add_argument('--first-token-delay', type=float, default=0.05)
+    parser.add_argument('--slow-rate', type=float, default=0.0)
+    parser.add_argument('--slow-delay', type=float, default=5.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--error-status', type=int, default=500)
+    args = parser.parse_args()
+
+    standin = StandinLLM(args.port, args.reply, args.first_token_delay, slow_rate=args.slow_rate,
+                         slow_delay=args.slow_delay, error_rate=args.error_rate, error_status=args.error_status)
+    print(f"Stand-in LLM listening on {standin.url}")
+    try:
+        standin.server.serve_forever()
+    except KeyboardInterrupt:
+        standin.server.server_close()
@@ -0,0 +1,158 @@
+import json
+import os
+import statistics
+import subprocess
+import tempfile
+import time
+
+# Runs generated code under cProfile + tracemalloc and dumps hot spots and allocations as JSON
+PROFILE_SCRIPT = r'''
+import cProfile, json, pstats, sys, time, tracemalloc
+code, stats_path, top = sys.argv[1], sys.argv[2], int(sys.argv[3])
+sys.argv = ["-c"]
+tracemalloc.start()
+profiler = cProfile.Profile()
+start = time.perf_counter()
+profiler.enable()
+try:
+    exec(compile(code, "<generated>", "exec"), {"__name__": "__main__"})
+finally:
+    profiler.disable()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    snapshot = tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, "<string>"), tracemalloc.Filter(False, tracemalloc.__file__)])
+    tracemalloc.stop()
+    stats = pstats.Stats(profiler).stats
+    hotspots = []
+    for (filename, line, func), (cc, nc, tt, ct, _) in stats.items():
+        if filename == "<string>" or func in ("<built-in method builtins.exec>", "<built-in method builtins.compile>",
+                                              "<method 'disable' of '_lsprof.Profiler' objects>"):
+            continue
+        hotspots.append({"function": f"{filename}:{line}({func})", "calls": nc,
+                         "self_time": round(tt, 4), "cumulative_time": round(ct, 4)})
+    hotspots.sort(key=lambda h: h["self_time"], reverse=True)
+    allocations = [{"location": str(stat.traceback), "size_kb": round(stat.size / 1024, 1), "count": stat.count}
+                   for stat in snapshot.statistics("lineno")[:top]]
+    with open(stats_path, "w") as f:
+        json.dump({"wall_time": round(elapsed, 4), "peak_memory_kb": round(peak / 1024, 1),
+                   "hotspots": hotspots[:top], "allocations": allocations}, f)
+'''
+
+
+def run_measured(code, timeout, cwd=None):
+    """Run code like AIAgent.execute_code, returning wall time, peak RSS and stdout."""
+    with tempfile.TemporaryFile() as stdout, tempfile.TemporaryFile() as stderr:
+        start = time.perf_counter()
+        proc = subprocess.Popen(['python3', '-c', code], stdout=stdout, stderr=stderr, cwd=cwd)
+        deadline = start + timeout
+        # wait4 gives the child's own max RSS, unlike getrusage(RUSAGE_CHILDREN) which is cumulative
+        while True:
+            pid, status, rusage = os.wait4(proc.pid, os.WNOHANG)
+            if pid:
+                break
+            if time.perf_counter() > deadline:
+                proc.kill()
+                os.wait4(proc.pid, 0)
+                proc.returncode = -9
+                return {"success": False, "error": f"Timed out after {timeout:.1f}s"}
+            time.sleep(0.005)
+        elapsed = time.perf_counter() - start
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        stdout.seek(0)
+        stderr.seek(0)
+        if proc.returncode != 0:
+            return {"success": False, "error": f"{stderr.read().decode(errors='replace')}\nExit code: {proc.returncode}"}
+        return {
+            "success": True,
+            "output": stdout.read().decode(errors='replace'),
+            "wall_time": elapsed,
+            # ru_maxrss is in kilobytes on Linux
+            "peak_rss_kb": rusage.ru_maxrss,
+        }
+
+
+def measure(code, repeats=3, timeout=60, cwd=None, time_limit=None):
+    """Run code `repeats` times; timeout applies to each run, time_limit (if set) to all of them together."""
+    deadline = time.perf_counter() + time_limit if time_limit is not None else None
+    runs = []
+    for _ in range(repeats):
+        run_timeout = timeout if deadline is None else min(timeout, deadline - time.perf_counter())
+        if run_timeout <= 0:
+            return {"success": False, "error": "Out of time before all measurement runs finished"}
+        run = run_measured(code, run_timeout, cwd)
+        if not run["success"]:
+            return run
+        runs.append(run)
+    return {
+        "success": True,
+        "output": runs[0]["output"],
+        "outputs": [run["output"] for run in runs],
+        "wall_time": statistics.median(run["wall_time"] for run in runs),
+        "peak_rss_kb": max(run["peak_rss_kb"] for run in runs),
+    }
+
+
+def profile_code(code, top=10, timeout=60, cwd=None):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        stats_path = os.path.join(tmp_dir, 'profile.json')
+        try:
+            subprocess.run(['python3', '-c', PROFILE_SCRIPT, code, stats_path, str(top)],
+                           capture_output=True, text=True, timeout=timeout, cwd=cwd)
+        except subprocess.TimeoutExpired:
+            return None
+        if not os.path.exists(stats_path):
+            return None
+        with open(stats_path) as f:
+            return json.load(f)
+
+
+def build_optimization_prompt(code, profile, baseline):
+    hotspots = "\n".join(
+        f"- {h['function']}: {h['calls']} calls, {h['self_time']}s self, {h['cumulative_time']}s cumulative"
+        for h in profile["hotspots"]) or "- (none recorded)"
+    allocations = "\n".join(
+        f"- {a['location']}: {a['size_kb']} KB in {a['count']} blocks" for a in profile["allocations"]) or "- (none recorded)"
+    return [
+        {"role": "system", "content": "You are an expert in Python performance. You rewrite programs to run faster "
+                                      "or use less memory without changing what they do."},
+        {"role": "user", "content": f"""This program works but is slow. Make it faster or leaner.
+
+Program:
+```python
+{code}
+```
+
+Measurements: wall time {baseline['wall_time']:.3f}s, peak RSS {baseline['peak_rss_kb']} KB, peak Python heap {profile['peak_memory_kb']} KB.
+
+Top hot spots (cProfile, by self time):
+{hotspots}
+
+Top allocations (tracemalloc):
+{allocations}
+
+Typical fixes: vectorize per-row pandas/numpy loops, batch model or API calls, avoid repeated work in loops,
+use generators instead of materializing large lists.
+
+Rules:
+- Print exactly the same output as the original program.
+- Keep the same side effects (files written, etc.).
+- Return the complete optimized program in a single ```python block."""},
+    ]
+
+
+def compare_runs(baseline, candidate, min_gain=0.1):
+    """Accept a rewrite only if its output is identical and it measurably wins on time or memory."""
+    if not candidate["success"]:
+        return False, f"Optimized code failed: {candidate['error'][-500:]}"
+    if len(set(baseline["outputs"])) > 1:
+        return False, "Original output is not deterministic, equivalence cannot be checked"
+    if any(output != baseline["output"] for output in candidate["outputs"]):
+        return False, "Optimized code produced different output"
+    time_ratio = candidate["wall_time"] / baseline["wall_time"] if baseline["wall_time"] else 1.0
+    memory_ratio = candidate["peak_rss_kb"] / baseline["peak_rss_kb"] if baseline["peak_rss_kb"] else 1.0
+    if time_ratio > 1 + min_gain or memory_ratio > 1 + min_gain:
+        return False, f"Regressed (time x{time_ratio:.2f}, memory x{memory_ratio:.2f})"
+    if time_ratio <= 1 - min_gain or memory_ratio <= 1 - min_gain:
+        return True, f"Improved (time x{time_ratio:.2f}, memory x{memory_ratio:.2f})"
+    return False, f"No measurable gain (time x{time_ratio:.2f}, memory x{memory_ratio:.2f})"
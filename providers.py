@@ -0,0 +1,339 @@
+import asyncio
+import json
+import os
+import threading
+import time
+
+import httpx
+
+# Send a duplicate request to the next endpoint if no token has arrived after this many seconds
+HEDGE_DELAY = float(os.environ.get("LLM_HEDGE_DELAY", "2.0"))
+# Consecutive failures before an endpoint is skipped for FAILURE_COOLDOWN seconds
+MAX_CONSECUTIVE_FAILURES = 3
+FAILURE_COOLDOWN = 30.0
+DEFAULT_TIMEOUT = 600.0
+
+
+class EndpointError(Exception):
+    pass
+
+
+class AllEndpointsFailed(Exception):
+    pass
+
+
+class RequestTimeout(AllEndpointsFailed):
+    """The deadline passed before any endpoint finished answering.
+
+    usage holds (model, price, CompletionUsage) estimates for the attempts that were cut off.
+    """
+
+    def __init__(self, message, usage=()):
+        super().__init__(message)
+        self.usage = list(usage)
+
+
+class FunctionCall:
+    def __init__(self, name="", arguments=""):
+        self.name = name
+        self.arguments = arguments
+
+
+class ToolCall:
+    def __init__(self, id="", name="", arguments=""):
+        self.id = id
+        self.type = "function"
+        self.function = FunctionCall(name, arguments)
+
+
+class CompletionUsage:
+    def __init__(self, prompt_tokens=0, completion_tokens=0, total_tokens=0):
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.total_tokens = total_tokens
+
+
+class Completion:
+    """The parts of a chat completion the agent uses, assembled from a streamed response."""
+
+    def __init__(self, endpoint, model, price=None):
+        self.endpoint = endpoint
+        self.model = model
+        # USD per million (prompt, completion) tokens as configured for the endpoint, None if not given
+        self.price = price
+        self.content = ""
+        self.tool_calls = []
+        self.usage = None
+        self.first_token_latency = None
+        self.latency = None
+        self.hedged = False
+        self.chunks = 0
+        # (model, price, CompletionUsage) estimates for cancelled hedge attempts, which are billed too
+        self.hedge_usage = []
+
+
+class Endpoint:
+    def __init__(self, name, base_url, model, api_key=None, debug_model=None, stream_usage=True, price=None,
+                 debug_price=None):
+        self.name = name
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.debug_model = debug_model or model
+        # USD per million (prompt, completion) tokens; debug_price defaults to price when there is no debug_model
+        self.price = tuple(price) if price else None
+        self.debug_price = tuple(debug_price) if debug_price else (self.price if debug_model is None else None)
+        self.api_key = api_key
+        self.stream_usage = stream_usage
+        # Health
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.slow = 0
+        self.unhealthy_until = 0.0
+        self.first_token_ewma = None
+        self.last_error = None
+
+    def model_for(self, debug):
+        return (self.debug_model, self.debug_price) if debug else (self.model, self.price)
+
+    def healthy(self):
+        return time.monotonic() >= self.unhealthy_until
+
+    def record_success(self, first_token_latency):
+        self.successes += 1
+        self.consecutive_failures = 0
+        self.unhealthy_until = 0.0
+        if first_token_latency is not None:
+            self.update_ewma(first_token_latency)
+
+    def record_slow(self, elapsed):
+        # Lost a hedge without a single token: its first token would have taken at least this long
+        self.slow += 1
+        self.update_ewma(elapsed)
+
+    def update_ewma(self, first_token_latency):
+        self.first_token_ewma = (first_token_latency if self.first_token_ewma is None
+                                 else 0.8 * self.first_token_ewma + 0.2 * first_token_latency)
+
+    def record_failure(self, error):
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.last_error = str(error)
+        if self.consecutive_failures >= MAX_CONSECUTIVE_FAILURES:
+            self.unhealthy_until = time.monotonic() + FAILURE_COOLDOWN
+
+    def health(self):
+        return {
+            "name": self.name,
+            "healthy": self.healthy(),
+            "successes": self.successes,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "slow": self.slow,
+            "first_token_ewma": round(self.first_token_ewma, 3) if self.first_token_ewma is not None else None,
+            "last_error": self.last_error,
+        }
+
+
+class ProviderPool:
+    """OpenAI-compatible endpoints with health tracking, failover and hedged requests.
+
+    A request goes to the endpoint with the fastest first tokens so far. If it has not streamed a
+    single token after hedge_delay seconds, a duplicate goes to the next endpoint and whichever
+    finishes first wins; the other one is cancelled. Failed attempts fail over to the next endpoint
+    immediately. Hedge losers that never streamed a token count as slow, attempts cut off by the
+    deadline as failed.
+
+    Requests run on one background event loop with one HTTP client, so connections (and their
+    TLS sessions) are reused across calls, agents and threads.
+    """
+
+    def __init__(self, endpoints, hedge_delay=HEDGE_DELAY, max_hedges=1):
+        if not endpoints:
+            raise ValueError("ProviderPool needs at least one endpoint")
+        self.endpoints = endpoints
+        self.hedge_delay = hedge_delay
+        self.max_hedges = max_hedges
+        self.lock = threading.Lock()
+        self.loop = None
+        self.client = None
+        self.pid = None
+
+    def event_loop(self):
+        with self.lock:
+            # A forked child (e.g. a batch worker) cannot use its parent's loop thread
+            if self.loop is None or self.pid != os.getpid():
+                self.loop = asyncio.new_event_loop()
+                self.pid = os.getpid()
+                self.client = None
+                threading.Thread(target=self.loop.run_forever, name="llm-providers", daemon=True).start()
+            return self.loop
+
+    def ordered_endpoints(self):
+        # Fastest first token first; endpoints not measured yet follow in configuration order, and
+        # endpoints cooling down after repeated failures go last
+        return sorted(self.endpoints, key=lambda e: (not e.healthy(), e.first_token_ewma is None,
+                                                     e.first_token_ewma or 0.0, self.endpoints.index(e)))
+
+    def health(self):
+        return [endpoint.health() for endpoint in self.endpoints]
+
+    def models(self, debug=False):
+        """(model, price) for every model a request may go to; price is None where not configured."""
+        return [endpoint.model_for(debug) for endpoint in self.endpoints]
+
+    def complete(self, messages, debug=False, timeout=None, **params):
+        """Blocking entry point, returns a Completion or raises AllEndpointsFailed (RequestTimeout
+        if the timeout ran out first)."""
+        future = asyncio.run_coroutine_threadsafe(
+            self._complete(messages, debug, timeout or DEFAULT_TIMEOUT, params), self.event_loop())
+        return future.result()
+
+    async def _complete(self, messages, debug, timeout, params):
+        if self.client is None:
+            # Created on the loop thread, the client belongs to this loop
+            self.client = httpx.AsyncClient(timeout=httpx.Timeout(DEFAULT_TIMEOUT, connect=10.0))
+        client = self.client
+        # Hedges and failovers only go to other endpoints; with a single endpoint there is neither
+        candidates = self.ordered_endpoints()
+        deadline = time.monotonic() + timeout
+        attempts = {}
+        errors = []
+        hedges = 0
+        next_index = 0
+
+        def launch():
+            nonlocal next_index
+            endpoint = candidates[next_index]
+            next_index += 1
+            completion = Completion(endpoint.name, *endpoint.model_for(debug))
+            task = asyncio.create_task(self._attempt(client, endpoint, completion, messages, params, timeout))
+            attempts[task] = (endpoint, completion, time.monotonic())
+            return task
+
+        launch()
+        try:
+            while attempts:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    for endpoint, _, _ in attempts.values():
+                        endpoint.record_failure(f"no answer within {timeout:.1f}s")
+                    raise RequestTimeout(f"No endpoint answered within {timeout:.1f}s: {errors}",
+                                         self.loser_usage(None, attempts.values()))
+                can_hedge = hedges < self.max_hedges and next_index < len(candidates)
+                waiting_for_token = all(c.first_token_latency is None for _, c, _ in attempts.values())
+                wait = remaining
+                if can_hedge and waiting_for_token:
+                    oldest = min(started for _, _, started in attempts.values())
+                    wait = max(0.0, min(remaining, oldest + self.hedge_delay - time.monotonic()))
+
+                done, _ = await asyncio.wait(attempts, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    if can_hedge and all(c.first_token_latency is None for _, c, _ in attempts.values()):
+                        hedges += 1
+                        launch()
+                    continue
+
+                for task in done:
+                    endpoint, completion, started = attempts.pop(task)
+                    error = task.exception()
+                    if error is None:
+                        completion.latency = time.monotonic() - started
+                        completion.hedged = hedges > 0
+                        completion.hedge_usage = self.loser_usage(completion, attempts.values())
+                        for loser_endpoint, loser, loser_started in attempts.values():
+                            if loser.first_token_latency is None:
+                                loser_endpoint.record_slow(time.monotonic() - loser_started)
+                        endpoint.record_success(completion.first_token_latency)
+                        return completion
+                    endpoint.record_failure(error)
+                    errors.append(f"{endpoint.name}: {error}")
+                if not attempts:
+                    if next_index >= len(candidates):
+                        raise AllEndpointsFailed("; ".join(errors))
+                    # Failover: nothing else in flight, move to the next endpoint right away
+                    launch()
+        finally:
+            # Cancel the losers so their connections are closed and they stop consuming tokens
+            for task in attempts:
+                task.cancel()
+            if attempts:
+                await asyncio.gather(*attempts, return_exceptions=True)
+
+    def loser_usage(self, winner, losers):
+        # Cancelled attempts report no usage; the prompt was still processed and each streamed chunk is ~1 token
+        prompt_tokens = winner.usage.prompt_tokens if winner is not None and winner.usage is not None else 0
+        return [(loser.model, loser.price, CompletionUsage(prompt_tokens, loser.chunks, prompt_tokens + loser.chunks))
+                for _, loser, _ in losers]
+
+    async def _attempt(self, client, endpoint, completion, messages, params, timeout):
+        started = time.monotonic()
+        payload = dict(params, model=completion.model, messages=messages, stream=True)
+        if endpoint.stream_usage:
+            payload["stream_options"] = {"include_usage": True}
+        headers = {"Authorization": f"Bearer {endpoint.api_key}"} if endpoint.api_key else {}
+        tool_calls = {}
+        async with client.stream("POST", f"{endpoint.base_url}/chat/completions", json=payload, headers=headers,
+                                 timeout=httpx.Timeout(timeout, connect=min(timeout, 10.0))) as response:
+            if response.status_code >= 400:
+                body = (await response.aread()).decode(errors="replace")
+                raise EndpointError(f"HTTP {response.status_code}: {body[:300]}")
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    continue  # read to the end so the connection goes back to the pool
+                chunk = json.loads(data)
+                if "error" in chunk:
+                    raise EndpointError(str(chunk["error"])[:300])
+                usage = chunk.get("usage") or (chunk.get("x_groq") or {}).get("usage")
+                if usage:
+                    completion.usage = CompletionUsage(usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0),
+                                                       usage.get("total_tokens", 0))
+                for choice in chunk.get("choices", []):
+                    delta = choice.get("delta") or {}
+                    if (delta.get("content") or delta.get("tool_calls")) and completion.first_token_latency is None:
+                        completion.first_token_latency = time.monotonic() - started
+                    if delta.get("content") or delta.get("tool_calls"):
+                        completion.chunks += 1
+                    completion.content += delta.get("content") or ""
+                    for call in delta.get("tool_calls") or []:
+                        # Tool calls stream as fragments keyed by index
+                        merged = tool_calls.setdefault(call.get("index", 0), ToolCall())
+                        merged.id = call.get("id") or merged.id
+                        function = call.get("function") or {}
+                        merged.function.name += function.get("name") or ""
+                        merged.function.arguments += function.get("arguments") or ""
+        completion.tool_calls = [tool_calls[i] for i in sorted(tool_calls)]
+        return completion
+
+
+def load_endpoints():
+    """Endpoints from LLM_ENDPOINTS (a JSON list), defaulting to Groq with the agent's usual models.
+
+    Each entry: {"name", "base_url", "model", "debug_model"?, "api_key"? or "api_key_env"?, "stream_usage"?,
+    "price"?, "debug_price"?}, prices being [prompt, completion] USD per million tokens.
+    """
+    raw = os.environ.get("LLM_ENDPOINTS")
+    if not raw:
+        return [Endpoint("groq", "https://api.groq.com/openai/v1", "qwen-2.5-coder-32b",
+                         api_key=os.environ.get("GROQ_API_KEY"), debug_model="qwen-2.5-32b")]
+    endpoints = []
+    for entry in json.loads(raw):
+        api_key = entry.get("api_key") or os.environ.get(entry.get("api_key_env", ""), None)
+        endpoints.append(Endpoint(entry["name"], entry["base_url"], entry["model"], api_key=api_key,
+                                  debug_model=entry.get("debug_model"), stream_usage=entry.get("stream_usage", True),
+                                  price=entry.get("price"), debug_price=entry.get("debug_price")))
+    return endpoints
+
+
+_default_pool = None
+
+
+def get_default_pool():
+    # Shared per process so endpoint health survives across agents and requests
+    global _default_pool
+    if _default_pool is None:
+        _default_pool = ProviderPool(load_endpoints())
+    return _default_pool
@@ -0,0 +1,102 @@
+// Served by the same FastAPI app, so a relative URL avoids CORS and hardcoded ports
+const API_URL = '/api/task';
+
+// Status color mappings
+const statusColors = {
+    'pending': 'bg-gray-500',
+    'in_progress': 'bg-yellow-500',
+    'completed': 'bg-green-500',
+    'failed': 'bg-red-500',
+    'error': 'bg-red-500'
+};
+
+document.getElementById('taskForm').addEventListener('submit', async (e) => {
+    e.preventDefault();
+
+    const task = document.getElementById('task').value;
+    const debug = document.getElementById('debug').checked;
+    const optimize = document.getElementById('optimize').checked;
+
+    // Create new task card
+    const taskCard = createTaskCard(task);
+    document.getElementById('results').prepend(taskCard);
+
+    try {
+        const response = await fetch(API_URL, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ task, debug, optimize })
+        });
+
+        const data = await response.json();
+        updateTaskCard(taskCard, data);
+
+    } catch (error) {
+        console.error('Error:', error);
+        taskCard.querySelector('.status-badge').textContent = 'Failed';
+        taskCard.querySelector('.status-badge').className = `status-badge px-4 py-1 rounded-full text-sm font-semibold ${statusColors.failed}`;
+    }
+});
+
+function createTaskCard(task) {
+    const template = document.getElementById('taskCardTemplate');
+    const card = template.content.cloneNode(true);
+
+    card.querySelector('.task-description').textContent = task;
+    card.querySelector('.status-badge').textContent = 'Pending';
+    card.querySelector('.status-badge').className = `status-badge px-4 py-1 rounded-full text-sm font-semibold ${statusColors.pending}`;
+
+    const taskCard = document.createElement('div');
+    taskCard.appendChild(card);
+    return taskCard.firstElementChild;
+}
+
+function createSubtaskElement(subtask) {
+    const template = document.getElementById('subtaskTemplate');
+    const element = template.content.cloneNode(true);
+
+    element.querySelector('.subtask-description').textContent = subtask.description;
+    element.querySelector('.subtask-status').textContent = subtask.status;
+    element.querySelector('.subtask-status').className = `subtask-status px-3 py-1 rounded-full text-sm ${statusColors[subtask.status]}`;
+
+    if (subtask.output) {
+        const outputElement = element.querySelector('.subtask-output');
+        outputElement.textContent = subtask.output;
+        outputElement.classList.remove('hidden');
+    }
+
+    if (subtask.error) {
+        const errorElement = element.querySelector('.subtask-error');
+        errorElement.textContent = subtask.error;
+        errorElement.classList.remove('hidden');
+    }
+
+    return element;
+}
+
+function updateTaskCard(card, data) {
+    card.querySelector('.task-id').textContent = data.task_id;
+    card.querySelector('.status-badge').textContent = data.status;
+    card.querySelector('.status-badge').className = `status-badge px-4 py-1 rounded-full text-sm font-semibold ${statusColors[data.status]}`;
+
+    if (data.usage) {
+        const usageElement = card.querySelector('.task-usage');
+        const parts = [
+            `${data.usage.llm_calls} LLM calls`,
+            `${data.usage.total_tokens} tokens`,
+            `$${data.usage.cost.toFixed(4)}`,
+            `${data.usage.wall_time.toFixed(1)}s`
+        ];
+        usageElement.textContent = parts.join(' · ') + (data.stop_reason ? ` — ${data.stop_reason}` : '');
+        usageElement.classList.remove('hidden');
+    }
+
+    const subtasksContainer = card.querySelector('.subtasks');
+    subtasksContainer.innerHTML = '';
+
+    data.subtasks.forEach(subtask => {
+        subtasksContainer.appendChild(createSubtaskElement(subtask));
+    });
+}
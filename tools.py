@@ -0,0 +1,205 @@
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from typing import List, Optional
+
+from pydantic import BaseModel, Field, ValidationError
+
+# name -> {"args": pydantic model, "func": callable, "description": str}
+TOOLS = {}
+TRANSCRIBE_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'transcribe.py')
+
+
+def tool(name, args_model, description):
+    """Register an in-process tool; args_model doubles as the JSON schema sent to the model.
+
+    Tools are called as func(args, time_limit, cwd), time_limit being the seconds left in the task's
+    wall time budget (None = unlimited), which every blocking call must respect, and cwd the
+    directory relative paths refer to (the attempt's workspace layer; None = current directory).
+    """
+    def register(func):
+        TOOLS[name] = {"args": args_model, "func": func, "description": description}
+        return func
+    return register
+
+
+class WriteFileArgs(BaseModel):
+    path: str = Field(description="File path, relative to the working directory")
+    content: str = Field(description="Full file content")
+    append: bool = Field(False, description="Append instead of overwriting")
+
+
+class ShellArgs(BaseModel):
+    command: str = Field(description="Shell command to run")
+    timeout: float = Field(120, description="Seconds before the command is killed")
+    background: bool = Field(False, description="Start a long-running process (e.g. a server) without waiting")
+
+
+PIP_TIMEOUT = 600
+
+
+class PipInstallArgs(BaseModel):
+    packages: List[str] = Field(description="Package specifiers, e.g. ['requests', 'flask==3.1.0']")
+    upgrade: bool = False
+
+
+class HttpFetchArgs(BaseModel):
+    url: str
+    method: str = "GET"
+    body: Optional[str] = None
+    headers: dict = Field(default_factory=dict)
+    timeout: float = 15
+    max_bytes: int = Field(20000, description="Truncate the returned body to this many bytes")
+
+
+class PortCheckArgs(BaseModel):
+    port: int
+    host: str = "127.0.0.1"
+    timeout: float = 2
+
+
+class TranscribeArgs(BaseModel):
+    audio: str = Field(description="Path of the audio file")
+    output: Optional[str] = Field(None, description="Write the transcript to this text file")
+    language: Optional[str] = None
+
+
+def cap_timeout(timeout, time_limit):
+    if time_limit is None:
+        return timeout
+    return time_limit if timeout is None else min(timeout, time_limit)
+
+
+@tool("write_file", WriteFileArgs, "Create or overwrite a text file (creates parent directories).")
+def write_file(args, time_limit=None, cwd=None):
+    path = os.path.join(cwd or '.', args.path)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'a' if args.append else 'w') as f:
+        f.write(args.content)
+    return f"Wrote {len(args.content)} characters to {args.path}"
+
+
+@tool("run_shell", ShellArgs, "Run a shell command and return its output. Fails on a non-zero exit code.")
+def run_shell(args, time_limit=None, cwd=None):
+    if args.background:
+        proc = subprocess.Popen(args.command, shell=True, stdout=subprocess.DEVNULL,
+                                stderr=subprocess.DEVNULL, start_new_session=True, cwd=cwd)
+        return f"Started background process {proc.pid}"
+    result = subprocess.run(args.command, shell=True, capture_output=True, text=True,
+                            timeout=cap_timeout(args.timeout, time_limit), cwd=cwd)
+    if result.returncode != 0:
+        raise RuntimeError(f"{result.stderr}\nExit code: {result.returncode}")
+    return result.stdout
+
+
+@tool("pip_install", PipInstallArgs, "Install Python packages into the current interpreter with pip.")
+def pip_install(args, time_limit=None, cwd=None):
+    cmd = [sys.executable, '-m', 'pip', 'install', '--quiet']
+    if args.upgrade:
+        cmd.append('--upgrade')
+    result = subprocess.run(cmd + args.packages, capture_output=True, text=True,
+                            timeout=cap_timeout(PIP_TIMEOUT, time_limit), cwd=cwd)
+    if result.returncode != 0:
+        raise RuntimeError(f"{result.stderr}\nExit code: {result.returncode}")
+    return f"Installed {', '.join(args.packages)}"
+
+
+@tool("http_fetch", HttpFetchArgs, "Make an HTTP request and return the status code and (truncated) body.")
+def http_fetch(args, time_limit=None, cwd=None):
+    data = args.body.encode() if args.body is not None else None
+    request = urllib.request.Request(args.url, data=data, headers=args.headers, method=args.method.upper())
+    try:
+        with urllib.request.urlopen(request, timeout=cap_timeout(args.timeout, time_limit)) as response:
+            status, body = response.status, response.read(args.max_bytes)
+    except urllib.error.HTTPError as e:
+        status, body = e.code, e.read(args.max_bytes)
+    return f"HTTP {status}\n{body.decode(errors='replace')}"
+
+
+@tool("check_port", PortCheckArgs, "Check whether a TCP port is accepting connections.")
+def check_port(args, time_limit=None, cwd=None):
+    try:
+        with socket.create_connection((args.host, args.port), timeout=cap_timeout(args.timeout, time_limit)):
+            return f"Port {args.port} on {args.host} is open"
+    except OSError:
+        raise RuntimeError(f"Port {args.port} on {args.host} is closed")
+
+
+@tool("transcribe_audio", TranscribeArgs, "Transcribe an audio file to text with the built-in local Whisper tool.")
+def transcribe_audio(args, time_limit=None, cwd=None):
+    # Run as a separate process so it can be killed when the wall time budget runs out
+    cmd = [sys.executable, TRANSCRIBE_SCRIPT, args.audio]
+    if args.output:
+        cmd += ['-o', args.output]
+    if args.language:
+        cmd += ['--language', args.language]
+    result = subprocess.run(cmd, capture_output=True, text=True, timeout=time_limit, cwd=cwd)
+    if result.returncode != 0:
+        raise RuntimeError(f"{result.stderr}\nExit code: {result.returncode}")
+    return result.stdout.strip()
+
+
+def tool_schemas():
+    """OpenAI-compatible `tools` payload for chat.completions.create."""
+    return [
+        {
+            "type": "function",
+            "function": {
+                "name": name,
+                "description": spec["description"],
+                "parameters": spec["args"].model_json_schema(),
+            },
+        }
+        for name, spec in TOOLS.items()
+    ]
+
+
+def run_tool(name, arguments, time_limit=None, cwd=None):
+    """Validate and run one tool call; returns the same shape as AIAgent.execute_code."""
+    spec = TOOLS.get(name)
+    if spec is None:
+        return {"success": False, "output": None, "error": f"Unknown tool '{name}'"}
+    try:
+        args = spec["args"].model_validate_json(arguments or "{}")
+    except ValidationError as e:
+        return {"success": False, "output": None, "error": f"Invalid arguments for {name}: {e}"}
+    try:
+        return {"success": True, "output": spec["func"](args, time_limit, cwd), "error": None}
+    except (subprocess.TimeoutExpired, TimeoutError) as e:
+        return {"success": False, "output": None, "error": f"Killed: out of time ({e})"}
+    except Exception as e:
+        return {"success": False, "output": None, "error": f"{type(e).__name__}: {e}"}
+
+
+def run_tool_calls(tool_calls, time_limit=None, cwd=None):
+    """Run a turn's tool calls in order, stopping at the first failure since later calls may depend on it.
+
+    time_limit (seconds) is shared by the whole turn, each call gets what the previous ones left.
+    """
+    deadline = time.monotonic() + time_limit if time_limit is not None else None
+    results = []
+    for call in tool_calls:
+        remaining = deadline - time.monotonic() if deadline is not None else None
+        if remaining is not None and remaining <= 0:
+            results.append((call, {"success": False, "output": None, "error": "Killed: out of time"}))
+            break
+        result = run_tool(call.function.name, call.function.arguments, remaining, cwd)
+        results.append((call, result))
+        if not result["success"]:
+            break
+    return results
+
+
+def describe_tool_call(call):
+    return f"{call.function.name}({call.function.arguments})"
+
+
+def tool_result_message(call, result):
+    content = result["output"] if result["success"] else f"ERROR: {result['error']}"
+    return {"role": "tool", "tool_call_id": call.id, "content": str(content)}
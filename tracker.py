@@ -0,0 +1,135 @@
+import cv2
+
+
+def box_iou(a, b):
+    ix1, iy1 = max(a[0], b[0]), max(a[1], b[1])
+    ix2, iy2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, ix2 - ix1) * max(0.0, iy2 - iy1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def greedy_match(tracks, detections, iou_threshold):
+    """Same-class greedy association by descending IoU, returns (pairs, unmatched tracks, unmatched detections)."""
+    candidates = []
+    for ti, track in enumerate(tracks):
+        for di, det in enumerate(detections):
+            if track.class_id != det['class_id']:
+                continue
+            iou = box_iou(track.box, det['box'])
+            if iou >= iou_threshold:
+                candidates.append((iou, ti, di))
+    pairs, used_tracks, used_dets = [], set(), set()
+    for _, ti, di in sorted(candidates, reverse=True):
+        if ti in used_tracks or di in used_dets:
+            continue
+        pairs.append((tracks[ti], detections[di]))
+        used_tracks.add(ti)
+        used_dets.add(di)
+    unmatched_tracks = [t for i, t in enumerate(tracks) if i not in used_tracks]
+    unmatched_dets = [d for i, d in enumerate(detections) if i not in used_dets]
+    return pairs, unmatched_tracks, unmatched_dets
+
+
+class Track:
+    def __init__(self, track_id, detection, frame_index):
+        self.track_id = track_id
+        self.class_id = detection['class_id']
+        self.label = detection['class']
+        self.confidence = detection['confidence']
+        self.box = list(detection['box'])
+        self.observed_box = list(detection['box'])
+        self.velocity = [0.0, 0.0, 0.0, 0.0]
+        self.last_seen = frame_index
+        self.misses = 0
+
+    def predict(self):
+        self.box = [c + v for c, v in zip(self.box, self.velocity)]
+
+    def observe(self, detection, frame_index, smoothing=0.5):
+        steps = max(1, frame_index - self.last_seen)
+        # Per-frame velocity measured since the last real observation, smoothed against jitter
+        measured = [(n - o) / steps for n, o in zip(detection['box'], self.observed_box)]
+        self.velocity = [smoothing * m + (1 - smoothing) * v for m, v in zip(measured, self.velocity)]
+        self.box = list(detection['box'])
+        self.observed_box = list(detection['box'])
+        self.confidence = detection['confidence']
+        self.last_seen = frame_index
+        self.misses = 0
+
+    def as_detection(self):
+        return {
+            'class_id': self.class_id,
+            'class': self.label,
+            'confidence': self.confidence,
+            'box': [round(c, 1) for c in self.box],
+            'track_id': self.track_id,
+        }
+
+
+class IoUTracker:
+    """ByteTrack-style two-pass IoU association with constant-velocity box propagation.
+
+    High-confidence detections are matched first and may start new tracks, low-confidence
+    ones only keep existing tracks alive, which avoids id churn on flickering detections.
+    """
+
+    def __init__(self, high_threshold=0.5, match_iou=0.3, low_match_iou=0.5, max_misses=2):
+        self.high_threshold = high_threshold
+        self.match_iou = match_iou
+        self.low_match_iou = low_match_iou
+        self.max_misses = max_misses
+        self.tracks = []
+        self._next_id = 1
+
+    def predict(self):
+        for track in self.tracks:
+            track.predict()
+        return self.detections()
+
+    def update(self, detections, frame_index):
+        high = [d for d in detections if d['confidence'] >= self.high_threshold]
+        low = [d for d in detections if d['confidence'] < self.high_threshold]
+
+        pairs, remaining, unmatched_high = greedy_match(self.tracks, high, self.match_iou)
+        low_pairs, remaining, _ = greedy_match(remaining, low, self.low_match_iou)
+        for track, det in pairs + low_pairs:
+            track.observe(det, frame_index)
+        for track in remaining:
+            track.misses += 1
+        self.tracks = [t for t in self.tracks if t.misses <= self.max_misses]
+        for det in unmatched_high:
+            self.tracks.append(Track(self._next_id, det, frame_index))
+            self._next_id += 1
+        return self.detections()
+
+    def detections(self):
+        return [t.as_detection() for t in self.tracks if t.misses == 0]
+
+
+class MotionGate:
+    """Cheap frame differencing on a downscaled grayscale copy against the last detected frame."""
+
+    def __init__(self, threshold=0.01, pixel_delta=25, width=160):
+        self.threshold = threshold
+        self.pixel_delta = pixel_delta
+        self.width = width
+        self.reference = None
+
+    def _prepare(self, frame):
+        height = max(1, int(frame.shape[0] * self.width / frame.shape[1]))
+        small = cv2.resize(frame, (self.width, height), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def changed_fraction(self, frame):
+        if self.reference is None:
+            return 1.0
+        diff = cv2.absdiff(self._prepare(frame), self.reference)
+        return float((diff > self.pixel_delta).mean())
+
+    def set_reference(self, frame):
+        self.reference = self._prepare(frame)
+
+    def has_motion(self, frame):
+        return self.changed_fraction(frame) > self.threshold
@@ -0,0 +1,207 @@
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.transcription_cache')
+
+
+def audio_digest(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def decode_to_pcm(path, pcm_path):
+    """Decode any ffmpeg-readable file to 16 kHz mono s16le on disk and memory-map it."""
+    cmd = ['ffmpeg', '-nostdin', '-v', 'error', '-y', '-i', path,
+           '-f', 's16le', '-ac', '1', '-ar', str(SAMPLE_RATE), pcm_path]
+    try:
+        subprocess.run(cmd, check=True, capture_output=True, text=True)
+    except FileNotFoundError:
+        raise RuntimeError("ffmpeg is required for transcription but was not found on PATH")
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"ffmpeg failed to decode {path}: {e.stderr.strip()}")
+    if os.path.getsize(pcm_path) == 0:
+        return np.zeros(0, dtype=np.int16)
+    return np.memmap(pcm_path, dtype=np.int16, mode='r')
+
+
+def split_on_silence(samples, frame_ms=30, silence_db=-40.0, min_silence_ms=400,
+                     max_chunk_s=30.0, pad_ms=200, pack_gap_ms=1500):
+    """Energy-based VAD: return (start, end) sample ranges of speech, each at most max_chunk_s long.
+
+    Speech regions separated by less than min_silence_ms are merged, neighbouring regions are
+    packed together (across pauses up to pack_gap_ms) up to max_chunk_s so the model sees
+    reasonably long context per chunk without decoding long stretches of silence.
+    """
+    frame_len = SAMPLE_RATE * frame_ms // 1000
+    n_frames = len(samples) // frame_len
+    if n_frames == 0:
+        return [(0, len(samples))] if len(samples) else []
+
+    frames = np.asarray(samples[:n_frames * frame_len], dtype=np.float32).reshape(n_frames, frame_len)
+    rms = np.sqrt(np.mean(frames ** 2, axis=1)) / 32768.0
+    voiced = rms > 10 ** (silence_db / 20)
+
+    # Collapse voiced frames into regions, bridging short pauses
+    min_gap = max(1, min_silence_ms // frame_ms)
+    regions = []
+    start = None
+    gap = 0
+    for i, is_voiced in enumerate(voiced):
+        if is_voiced:
+            if start is None:
+                start = i
+            gap = 0
+        elif start is not None:
+            gap += 1
+            if gap >= min_gap:
+                regions.append((start, i - gap + 1))
+                start, gap = None, 0
+    if start is not None:
+        regions.append((start, n_frames - gap))
+
+    pad = pad_ms // frame_ms
+    pack_gap = pack_gap_ms // frame_ms
+    max_frames = int(max_chunk_s * 1000 // frame_ms)
+    chunks = []
+    for region_start, region_end in regions:
+        region_start = max(0, region_start - pad)
+        region_end = min(n_frames, region_end + pad)
+        # Hard-split regions that are longer than the model window
+        while region_end - region_start > max_frames:
+            chunks.append([region_start, region_start + max_frames])
+            region_start += max_frames
+        if chunks and region_end - chunks[-1][0] <= max_frames and region_start - chunks[-1][1] <= pack_gap:
+            chunks[-1][1] = region_end
+        else:
+            chunks.append([region_start, region_end])
+    return [(s * frame_len, min(len(samples), e * frame_len)) for s, e in chunks]
+
+
+_worker_model = None
+
+
+def _init_worker(model_name, threads):
+    global _worker_model
+    import torch
+    import whisper
+    # Several workers share the CPU, so each one gets its own slice of cores
+    torch.set_num_threads(threads)
+    _worker_model = whisper.load_model(model_name, device='cpu')
+
+
+def _transcribe_chunk(pcm_path, start, end, language):
+    # Workers map the shared PCM file themselves instead of receiving pickled audio
+    samples = np.memmap(pcm_path, dtype=np.int16, mode='r')[start:end]
+    audio = samples.astype(np.float32) / 32768.0
+    result = _worker_model.transcribe(audio, language=language, fp16=False)
+    offset = start / SAMPLE_RATE
+    return {
+        'text': result['text'].strip(),
+        'segments': [
+            {'start': round(seg['start'] + offset, 2), 'end': round(seg['end'] + offset, 2), 'text': seg['text'].strip()}
+            for seg in result['segments']
+        ],
+    }
+
+
+def load_cached(key, cache_dir=CACHE_DIR):
+    path = os.path.join(cache_dir, f"{key}.json")
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return None
+
+
+def save_cached(key, result, cache_dir=CACHE_DIR):
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = os.path.join(cache_dir, f"{key}.json.tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(result, f)
+    os.replace(tmp_path, os.path.join(cache_dir, f"{key}.json"))
+
+
+def transcribe(path, model_name='base', workers=None, language=None, use_cache=True, cache_dir=CACHE_DIR):
+    """Transcribe an audio file: ffmpeg decode -> silence split -> parallel whisper -> stitched text.
+
+    Results are cached by audio content hash (plus model and language), so re-running the same
+    file is a file read regardless of its name or location.
+    """
+    key = hashlib.sha256(f"{audio_digest(path)}:{model_name}:{language}".encode()).hexdigest()[:32]
+    if use_cache:
+        cached = load_cached(key, cache_dir)
+        if cached is not None:
+            cached['cached'] = True
+            return cached
+
+    timings = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pcm_path = os.path.join(tmp_dir, 'audio.pcm')
+        start = time.perf_counter()
+        samples = decode_to_pcm(path, pcm_path)
+        timings['decode_s'] = round(time.perf_counter() - start, 3)
+
+        chunks = split_on_silence(samples)
+        duration = len(samples) / SAMPLE_RATE
+        del samples
+
+        start = time.perf_counter()
+        cpus = os.cpu_count() or 1
+        workers = max(1, min(workers or cpus, len(chunks), cpus))
+        threads = max(1, cpus // workers)
+        outputs = []
+        if chunks:
+            # spawn, not fork: forking a process that already imported torch can deadlock
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                     initializer=_init_worker, initargs=(model_name, threads)) as pool:
+                outputs = list(pool.map(_transcribe_chunk, [pcm_path] * len(chunks),
+                                        [s for s, _ in chunks], [e for _, e in chunks],
+                                        [language] * len(chunks)))
+        timings['transcribe_s'] = round(time.perf_counter() - start, 3)
+
+    result = {
+        'text': ' '.join(out['text'] for out in outputs if out['text']),
+        'segments': [seg for out in outputs for seg in out['segments']],
+        'chunks': [[round(s / SAMPLE_RATE, 2), round(e / SAMPLE_RATE, 2)] for s, e in chunks],
+        'duration_s': round(duration, 2),
+        'model': model_name,
+        'workers': workers,
+        'timings': timings,
+    }
+    if use_cache:
+        save_cached(key, result, cache_dir)
+    result['cached'] = False
+    return result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Transcribe an audio file with a local Whisper model')
+    parser.add_argument('audio')
+    parser.add_argument('-o', '--output', help='write the transcript text to this file')
+    parser.add_argument('--model', default='base', help='whisper model name (tiny, base, small, ...)')
+    parser.add_argument('--workers', type=int, help='parallel worker processes (default: CPU count)')
+    parser.add_argument('--language', help='language code, auto-detected if omitted')
+    parser.add_argument('--no-cache', action='store_true')
+    parser.add_argument('--json', action='store_true', help='print the full result as JSON')
+    args = parser.parse_args()
+
+    result = transcribe(args.audio, args.model, args.workers, args.language, use_cache=not args.no_cache)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(result['text'] + '\n')
+        print(f"Transcription saved to {args.output}", file=sys.stderr)
+    print(json.dumps(result, indent=2) if args.json else result['text'])
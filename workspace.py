@@ -0,0 +1,272 @@
+import fcntl
+import os
+import shutil
+import stat
+import subprocess
+import tempfile
+import time
+import uuid
+
+LAYER_DIR = '.workspace_layers'
+# Shared, not layered (tree layers link them to the base): VCS data, virtualenvs and caches
+EXCLUDE = {'.git', '__pycache__', 'node_modules', '.venv', 'venv', 'env', '.model_cache', '.transcription_cache',
+           'batch_runs', LAYER_DIR}
+# From linux/fs.h, clones a file's extents instead of copying its data (btrfs, XFS, bcachefs, ...)
+FICLONE = 0x40049409
+OVERLAY_OPAQUE = 'trusted.overlay.opaque'
+
+_overlay_supported = None
+
+
+def clone_file(src, dst):
+    """Copy src to dst as a reflink when the filesystem supports it, otherwise as a plain copy.
+
+    Returns True if the file was reflinked.
+    """
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        try:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+            reflinked = True
+        except OSError:
+            shutil.copyfileobj(fsrc, fdst, 1024 * 1024)
+            reflinked = False
+    shutil.copystat(src, dst, follow_symlinks=False)
+    return reflinked
+
+
+def copy_entry(src, dst):
+    """Replace dst with a copy of the file or symlink src, through a temporary name."""
+    tmp = f"{dst}.{uuid.uuid4().hex[:8]}.tmp"
+    if os.path.islink(src):
+        os.symlink(os.readlink(src), tmp)
+    else:
+        clone_file(src, tmp)
+    if os.path.isdir(dst) and not os.path.islink(dst):
+        shutil.rmtree(dst)
+    os.replace(tmp, dst)
+
+
+def remove_entry(path):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path, ignore_errors=True)
+    elif os.path.lexists(path):
+        os.remove(path)
+
+
+def signature(st):
+    # Same idea as git's index: a file whose size, mtime and mode are unchanged is assumed unchanged
+    return (st.st_size, st.st_mtime_ns, st.st_mode)
+
+
+def overlay_supported():
+    """Whether this process may mount overlayfs (root or CAP_SYS_ADMIN); checked once with a scratch mount."""
+    global _overlay_supported
+    if _overlay_supported is None:
+        scratch = tempfile.mkdtemp(prefix='overlay-check-')
+        dirs = [os.path.join(scratch, name) for name in ('lower', 'upper', 'work', 'merged')]
+        for path in dirs:
+            os.mkdir(path)
+        try:
+            mount_overlay([dirs[0]], dirs[1], dirs[2], dirs[3])
+            unmount(dirs[3])
+            _overlay_supported = True
+        except (OSError, subprocess.CalledProcessError):
+            _overlay_supported = False
+        shutil.rmtree(scratch, ignore_errors=True)
+    return _overlay_supported
+
+
+def mount_overlay(lowers, upper, work, merged):
+    subprocess.run(['mount', '-t', 'overlay', 'overlay', '-o',
+                    f"lowerdir={':'.join(lowers)},upperdir={upper},workdir={work}", merged],
+                   check=True, capture_output=True)
+
+
+def unmount(path):
+    # Lazy, so a background process started by the attempt (e.g. a server) cannot block it
+    subprocess.run(['umount', '-l', path], check=False, capture_output=True)
+
+
+class Workspace:
+    """Runs each attempt of a task in its own layer over a base directory.
+
+    begin() returns a fresh layer directory holding the last committed state. Generated code and
+    tools run there (cwd=), never in the base. commit() promotes the layer to the new last good
+    state, drop() throws it away, and apply() writes everything committed back to the base once
+    the task is over, so concurrent tasks sharing a base never see each other's attempts.
+
+    With overlayfs (root or CAP_SYS_ADMIN) a layer is a mount: creating, committing and dropping
+    one costs the same whatever the workspace size, and the kernel copies a file up only when it
+    is written. Promoting just pushes the layer's upper dir onto the lower stack. Otherwise a
+    layer is a tree of reflinks (btrfs, XFS), or of plain copies on filesystems without them.
+    Hardlink trees are not used: without the kernel's copy-up, code rewriting a file in place
+    would modify the committed state through the shared inode.
+    """
+
+    def __init__(self, base='.', exclude=()):
+        self.base = os.path.abspath(base)
+        self.exclude = EXCLUDE | set(exclude)
+        self.overlay = overlay_supported()
+        if self.overlay:
+            # Upper and work dirs may not live inside a lower dir, i.e. inside the base
+            self.root = tempfile.mkdtemp(prefix='workspace-')
+        else:
+            self.root = os.path.join(self.base, LAYER_DIR, uuid.uuid4().hex[:12])
+            os.makedirs(self.root)
+        self.committed = []  # overlay: upper dirs, newest first; tree: [last good layer]
+        self.base_files = None  # tree: base signatures when the first layer was cloned
+        self.current = None
+        self.merged = None
+        self.layers = 0
+
+    def begin(self):
+        """Create a layer for the next attempt and return the directory to run it in."""
+        if self.current is not None:
+            self.drop()
+        start = time.perf_counter()
+        self.layers += 1
+        self.current = os.path.join(self.root, f"layer{self.layers}")
+        os.mkdir(self.current)
+        if self.overlay:
+            for name in ('upper', 'work', 'merged'):
+                os.mkdir(os.path.join(self.current, name))
+            self.merged = os.path.join(self.current, 'merged')
+            mount_overlay(self.committed + [self.base], os.path.join(self.current, 'upper'),
+                          os.path.join(self.current, 'work'), self.merged)
+            workdir = self.merged
+        else:
+            source = self.committed[0] if self.committed else self.base
+            workdir = os.path.join(self.current, 'tree')
+            reflinked = self.clone_tree(source, workdir)
+            if not reflinked and self.layers == 1:
+                print("Workspace: no overlayfs or reflink support, layers are full copies")
+        print(f"Workspace layer {self.layers} ready in {(time.perf_counter() - start) * 1000:.1f}ms")
+        return workdir
+
+    def commit(self):
+        """Promote the current layer to the last good state."""
+        if self.current is None:
+            return
+        if self.overlay:
+            unmount(self.merged)
+            shutil.rmtree(os.path.join(self.current, 'work'), ignore_errors=True)
+            self.committed.insert(0, os.path.join(self.current, 'upper'))
+        else:
+            if self.committed:
+                shutil.rmtree(os.path.dirname(self.committed[0]), ignore_errors=True)
+            self.committed = [os.path.join(self.current, 'tree')]
+        self.current = self.merged = None
+
+    def drop(self):
+        """Throw the current layer away, leaving the last good state untouched."""
+        if self.current is None:
+            return
+        if self.overlay:
+            unmount(self.merged)
+        shutil.rmtree(self.current, ignore_errors=True)
+        self.current = self.merged = None
+
+    def apply(self):
+        """Write the committed changes into the base directory."""
+        start = time.perf_counter()
+        if self.overlay:
+            # Oldest first, so later subtasks win
+            changed = sum(self.apply_upper(upper) for upper in reversed(self.committed))
+        else:
+            changed = self.apply_tree(self.committed[0]) if self.committed else 0
+        print(f"Workspace: {changed} changes applied to {self.base} in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    def close(self):
+        self.drop()
+        shutil.rmtree(self.root, ignore_errors=True)
+        if not self.overlay:
+            try:
+                os.rmdir(os.path.dirname(self.root))
+            except OSError:
+                pass  # other tasks still have layers here
+
+    def clone_tree(self, source, target):
+        reflinked = True
+        record = self.base_files is None
+        if record:
+            self.base_files = {}
+        for dirpath, dirnames, filenames in os.walk(source):
+            rel_dir = os.path.relpath(dirpath, source)
+            os.makedirs(os.path.join(target, rel_dir), exist_ok=True)
+            for name in list(dirnames):
+                if name in self.exclude or os.path.islink(os.path.join(dirpath, name)):
+                    dirnames.remove(name)
+                    filenames.append(name)
+            for name in filenames:
+                src = os.path.join(dirpath, name)
+                dst = os.path.normpath(os.path.join(target, rel_dir, name))
+                rel = os.path.normpath(os.path.join(rel_dir, name))
+                if name in self.exclude and source == self.base:
+                    os.symlink(src, dst)
+                    continue
+                st = os.lstat(src)
+                if stat.S_ISLNK(st.st_mode):
+                    os.symlink(os.readlink(src), dst)
+                elif stat.S_ISREG(st.st_mode):
+                    reflinked = clone_file(src, dst) and reflinked
+                else:
+                    continue
+                if record:
+                    self.base_files[rel] = signature(st)
+        return reflinked
+
+    def apply_tree(self, tree):
+        changed = 0
+        seen = set()
+        for dirpath, dirnames, filenames in os.walk(tree):
+            rel_dir = os.path.relpath(dirpath, tree)
+            os.makedirs(os.path.join(self.base, rel_dir), exist_ok=True)
+            for name in list(dirnames):
+                if os.path.islink(os.path.join(dirpath, name)):
+                    dirnames.remove(name)
+                    filenames.append(name)
+            for name in filenames:
+                src = os.path.join(dirpath, name)
+                rel = os.path.normpath(os.path.join(rel_dir, name))
+                if name in self.exclude and os.path.islink(src):
+                    continue  # a link to the shared base directory
+                seen.add(rel)
+                st = os.lstat(src)
+                if self.base_files.get(rel) == signature(st):
+                    continue
+                copy_entry(src, os.path.join(self.base, rel))
+                changed += 1
+        for rel, sig in self.base_files.items():
+            path = os.path.join(self.base, rel)
+            # Deleted by the task; left alone if someone else changed it in the meantime
+            if rel not in seen and os.path.lexists(path) and signature(os.lstat(path)) == sig:
+                os.remove(path)
+                changed += 1
+        return changed
+
+    def apply_upper(self, upper):
+        changed = 0
+        for dirpath, dirnames, filenames in os.walk(upper):
+            rel_dir = os.path.relpath(dirpath, upper)
+            for name in dirnames + filenames:
+                src = os.path.join(dirpath, name)
+                dst = os.path.normpath(os.path.join(self.base, rel_dir, name))
+                st = os.lstat(src)
+                if stat.S_ISCHR(st.st_mode) and st.st_rdev == 0:
+                    # Whiteout: the attempt deleted this path
+                    remove_entry(dst)
+                elif stat.S_ISDIR(st.st_mode):
+                    try:
+                        opaque = os.getxattr(src, OVERLAY_OPAQUE, follow_symlinks=False) == b'y'
+                    except OSError:
+                        opaque = False
+                    # An opaque directory replaced whatever was there before
+                    if opaque or (os.path.lexists(dst) and not os.path.isdir(dst)) or os.path.islink(dst):
+                        remove_entry(dst)
+                    os.makedirs(dst, exist_ok=True)
+                    continue
+                else:
+                    os.makedirs(os.path.dirname(dst), exist_ok=True)
+                    copy_entry(src, dst)
+                changed += 1
+        return changed
@@ -1,36 +1,556 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from collections import deque
 
 import cv2
-from ultralytics import YOLO
-
-# Load the YOLOv8n model
-model = YOLO('yolov8n.pt')
-
-# Initialize the video capture object
-cap = cv2.VideoCapture(0)  # 0 is the default camera; use the appropriate camera index if needed
-
-while True:
-    ret, frame = cap.read()
-    if not ret:
-        break
-    
-    # Perform object detection on the frame
-    results = model(frame)
-    
-    # Draw bounding boxes on the frame
-    for result in results:
-        boxes = result.boxes
-        for box in boxes:
-            x1, y1, x2, y2 = box.xyxy[0].tolist()
-            cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), (0, 255, 0), 2)
-            cv2.putText(frame, 'Person', (int(x1), int(y1) - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
-
-    # Display the frame
-    cv2.imshow('Frame', frame)
-    
-    # Break the loop if 'q' is pressed
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
-
-# Release the video capture object and close all windows
-cap.release()
-cv2.destroyAllWindows()
+
+from tracker import IoUTracker, MotionGate, box_iou
+from yolo_backends import BACKENDS, load_model
+
+
+class LatestFrameBuffer:
+    """One-slot buffer: put() overwrites the unread item so consumers always get the newest frame."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._item = None
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if self._item is not None:
+                self.dropped += 1
+            self._item = item
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._item is not None or self._closed, timeout):
+                return None
+            item, self._item = self._item, None
+            return item
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+
+class StageStats:
+    """Rolling per-stage FPS plus end-to-end latency over a short window."""
+
+    def __init__(self, stages, window=2.0):
+        self.window = window
+        self._lock = threading.Lock()
+        self._ticks = {stage: deque() for stage in stages}
+        self._latencies = deque()
+
+    def tick(self, stage):
+        now = time.perf_counter()
+        with self._lock:
+            ticks = self._ticks[stage]
+            ticks.append(now)
+            while ticks and now - ticks[0] > self.window:
+                ticks.popleft()
+
+    def latency(self, captured_at):
+        now = time.perf_counter()
+        with self._lock:
+            self._latencies.append((now, now - captured_at))
+            while self._latencies and now - self._latencies[0][0] > self.window:
+                self._latencies.popleft()
+
+    def fps(self, stage):
+        with self._lock:
+            ticks = self._ticks[stage]
+            if len(ticks) < 2:
+                return 0.0
+            return (len(ticks) - 1) / (ticks[-1] - ticks[0])
+
+    def summary(self):
+        parts = [f"{stage} {self.fps(stage):5.1f} fps" for stage in self._ticks]
+        with self._lock:
+            latencies = sorted(lat for _, lat in self._latencies)
+        if latencies:
+            p50 = latencies[len(latencies) // 2] * 1000
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000
+            parts.append(f"latency p50 {p50:.0f} ms p95 {p95:.0f} ms")
+        return " | ".join(parts)
+
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.webp'}
+VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mov', '.mkv', '.webm'}
+
+
+def result_to_detections(result):
+    detections = []
+    for box in result.boxes:
+        class_id = int(box.cls[0])
+        detections.append({
+            'class_id': class_id,
+            'class': result.names[class_id],
+            'confidence': round(float(box.conf[0]), 4),
+            'box': [round(v, 1) for v in box.xyxy[0].tolist()],
+        })
+    return detections
+
+
+def match_detections(reference, candidate, iou_threshold=0.5):
+    """Greedy same-class matching, returns the IoU of every matched pair."""
+    ious = []
+    unmatched = list(candidate)
+    for ref in sorted(reference, key=lambda d: -d['confidence']):
+        best, best_iou = None, iou_threshold
+        for det in unmatched:
+            if det['class_id'] != ref['class_id']:
+                continue
+            iou = box_iou(ref['box'], det['box'])
+            if iou >= best_iou:
+                best, best_iou = det, iou
+        if best is not None:
+            unmatched.remove(best)
+            ious.append(best_iou)
+    return ious
+
+
+class FrameDetector:
+    """Full model inference on every frame."""
+
+    def __init__(self, model, device=None):
+        self.model = model
+        self.device = device
+
+    def __call__(self, frame):
+        return result_to_detections(self.model(frame, verbose=False, device=self.device)[0])
+
+    def summary(self):
+        return None
+
+
+class AdaptiveDetector:
+    """Motion-gated, keyframe-only inference with tracked boxes in between.
+
+    Each frame is one of:
+      skip   - no motion since the last keyframe, previous boxes are reused as-is
+      track  - motion, but not a keyframe yet: tracked boxes are advanced by their velocity
+      detect - every `detect_every` frames with motion (or after `max_skip` static frames)
+    At every keyframe the propagated boxes are scored against the fresh detections, which
+    gives the detection-consistency metric for the frames that skipped the model.
+    """
+
+    def __init__(self, model, detect_every=5, motion_threshold=0.01, max_skip=30, device=None):
+        self.model = model
+        self.device = device
+        self.detect_every = detect_every
+        self.max_skip = max_skip
+        self.gate = MotionGate(threshold=motion_threshold)
+        self.tracker = IoUTracker()
+        self.frame_index = 0
+        self.last_detect = None
+        self.last_mode = None
+        self.counts = {'detect': 0, 'track': 0, 'skip': 0}
+        self.matched = self.predicted = self.fresh = 0
+        self.iou_sum = 0.0
+
+    def _mode(self, frame):
+        if self.last_detect is None:
+            return 'detect'
+        since = self.frame_index - self.last_detect
+        if not self.gate.has_motion(frame):
+            return 'detect' if since >= self.max_skip else 'skip'
+        return 'detect' if since >= self.detect_every else 'track'
+
+    def __call__(self, frame):
+        mode = self._mode(frame)
+        if mode == 'skip':
+            detections = self.tracker.detections()
+        elif mode == 'track':
+            detections = self.tracker.predict()
+        else:
+            predicted = self.tracker.predict() if self.last_detect is not None else None
+            fresh = result_to_detections(self.model(frame, verbose=False, device=self.device)[0])
+            if predicted is not None:
+                ious = match_detections(fresh, predicted)
+                self.matched += len(ious)
+                self.iou_sum += sum(ious)
+                self.predicted += len(predicted)
+                self.fresh += len(fresh)
+            detections = self.tracker.update(fresh, self.frame_index)
+            self.gate.set_reference(frame)
+            self.last_detect = self.frame_index
+        self.counts[mode] += 1
+        self.last_mode = mode
+        self.frame_index += 1
+        return detections
+
+    def metrics(self):
+        frames = sum(self.counts.values())
+        return {
+            'frames': frames,
+            'inference_rate': round(self.counts['detect'] / frames, 3) if frames else 0.0,
+            'skip_rate': round((self.counts['skip'] + self.counts['track']) / frames, 3) if frames else 0.0,
+            'counts': dict(self.counts),
+            # Agreement of propagated boxes with fresh detections at keyframes
+            'consistency_recall': round(self.matched / self.fresh, 3) if self.fresh else 1.0,
+            'consistency_precision': round(self.matched / self.predicted, 3) if self.predicted else 1.0,
+            'consistency_mean_iou': round(self.iou_sum / self.matched, 3) if self.matched else 0.0,
+        }
+
+    def summary(self):
+        m = self.metrics()
+        return (f"skip rate {m['skip_rate']:.0%} (skip {m['counts']['skip']}, track {m['counts']['track']}, "
+                f"detect {m['counts']['detect']}) | consistency recall {m['consistency_recall']:.2f} "
+                f"precision {m['consistency_precision']:.2f} IoU {m['consistency_mean_iou']:.2f}")
+
+
+def draw_detections(frame, detections):
+    for detection in detections:
+        x1, y1, x2, y2 = (int(v) for v in detection['box'])
+        label = f"{detection['class']} {detection['confidence']:.2f}"
+        if 'track_id' in detection:
+            label = f"#{detection['track_id']} {label}"
+        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+        cv2.putText(frame, label, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
+    return frame
+
+
+def expand_inputs(inputs):
+    """Flatten files and directories into a sorted list of image/video paths."""
+    paths = []
+    for path in inputs:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS | VIDEO_EXTENSIONS:
+                    paths.append(os.path.join(path, name))
+        elif os.path.exists(path):
+            paths.append(path)
+        else:
+            raise FileNotFoundError(f"Input not found: {path}")
+    return paths
+
+
+def iter_frames(paths):
+    """Yield (path, frame_index, frame) for every image and every video frame."""
+    for path in paths:
+        if os.path.splitext(path)[1].lower() in VIDEO_EXTENSIONS:
+            cap = cv2.VideoCapture(path)
+            index = 0
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                yield path, index, frame
+                index += 1
+            cap.release()
+        else:
+            frame = cv2.imread(path)
+            if frame is None:
+                print(f"Skipping unreadable image: {path}", file=sys.stderr)
+                continue
+            yield path, 0, frame
+
+
+def iter_batches(items, batch_size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def detect_adaptive(model, paths, output, device='cpu', **options):
+    """Sequential motion-gated detection, a fresh tracker per source so ids never leak across files."""
+    frames = 0
+    detector = current = None
+    for path, index, frame in iter_frames(paths):
+        if path != current:
+            if detector is not None:
+                print(f"{current}: {detector.summary()}", file=sys.stderr)
+            detector = AdaptiveDetector(model, device=device, **options)
+            current = path
+        detections = detector(frame)
+        record = {'source': path, 'frame': index, 'mode': detector.last_mode, 'detections': detections}
+        output.write(json.dumps(record) + '\n')
+        frames += 1
+    if detector is not None:
+        print(f"{current}: {detector.summary()}", file=sys.stderr)
+    return frames
+
+
+def detect_files(model, inputs, batch_size=8, output=sys.stdout, device='cpu', adaptive=None):
+    """Headless detection: one NDJSON line per frame, frames batched into a single model call.
+
+    With `adaptive` (AdaptiveDetector options) frames are processed in order instead of batched.
+    """
+    frames = 0
+    start = time.perf_counter()
+    if adaptive is not None:
+        frames = detect_adaptive(model, expand_inputs(inputs), output, device, **adaptive)
+    else:
+        for batch in iter_batches(iter_frames(expand_inputs(inputs)), batch_size):
+            results = model([frame for _, _, frame in batch], verbose=False, device=device)
+            for (path, index, _), result in zip(batch, results):
+                record = {'source': path, 'frame': index, 'detections': result_to_detections(result)}
+                output.write(json.dumps(record) + '\n')
+            frames += len(batch)
+    elapsed = time.perf_counter() - start
+    print(f"Processed {frames} frames in {elapsed:.2f}s ({frames / elapsed if elapsed else 0:.1f} fps)",
+          file=sys.stderr)
+
+
+def benchmark(model, inputs, batch_sizes, frames=64, warmup=2, device='cpu'):
+    """Report throughput and per-batch latency for each batch size on the same frame set."""
+    pool = [frame for _, _, frame in iter_frames(expand_inputs(inputs))]
+    if not pool:
+        raise ValueError("No frames to benchmark")
+    # Repeat the inputs so every batch size sees the same number of frames
+    sample = [pool[i % len(pool)] for i in range(frames)]
+    rows = []
+    for batch_size in batch_sizes:
+        batches = list(iter_batches(sample, batch_size))
+        for batch in batches[:warmup]:
+            model(batch, verbose=False, device=device)
+        latencies = []
+        start = time.perf_counter()
+        for batch in batches:
+            t0 = time.perf_counter()
+            model(batch, verbose=False, device=device)
+            latencies.append(time.perf_counter() - t0)
+        elapsed = time.perf_counter() - start
+        latencies.sort()
+        rows.append({
+            'batch_size': batch_size,
+            'throughput_fps': round(len(sample) / elapsed, 2),
+            'batch_latency_ms_p50': round(statistics.median(latencies) * 1000, 1),
+            'batch_latency_ms_p95': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 1),
+            'frame_latency_ms': round(elapsed / len(sample) * 1000, 1),
+        })
+    print(f"{'batch':>5} {'fps':>8} {'p50 ms':>8} {'p95 ms':>8} {'ms/frame':>9}")
+    for row in rows:
+        print(f"{row['batch_size']:>5} {row['throughput_fps']:>8} {row['batch_latency_ms_p50']:>8} "
+              f"{row['batch_latency_ms_p95']:>8} {row['frame_latency_ms']:>9}")
+    return rows
+
+
+class DetectionPipeline:
+    """capture thread -> latest-frame buffer -> inference thread -> latest-result buffer -> render (caller thread).
+
+    Capture never waits on inference: if the model is slower than the camera, stale frames
+    are overwritten instead of queueing up, so latency stays bounded by one inference.
+    """
+
+    def __init__(self, detector, source=0, display=True, report_every=1.0):
+        self.detector = detector
+        self.source = source
+        self.display = display
+        self.report_every = report_every
+        self.frames = LatestFrameBuffer()
+        self.results = LatestFrameBuffer()
+        self.stats = StageStats(['capture', 'inference', 'render'])
+        self.stop_event = threading.Event()
+
+    def _capture_loop(self, cap):
+        frame_id = 0
+        while not self.stop_event.is_set():
+            ret, frame = cap.read()
+            if not ret:
+                break
+            self.stats.tick('capture')
+            self.frames.put((frame_id, time.perf_counter(), frame))
+            frame_id += 1
+        self.frames.close()
+
+    def _inference_loop(self):
+        while not self.stop_event.is_set():
+            item = self.frames.get(timeout=0.1)
+            if item is None:
+                if self.frames.closed:
+                    break
+                continue
+            frame_id, captured_at, frame = item
+            detections = self.detector(frame)
+            self.stats.tick('inference')
+            self.results.put((frame_id, captured_at, frame, detections))
+        self.results.close()
+
+    def run(self):
+        cap = cv2.VideoCapture(self.source)
+        threads = [
+            threading.Thread(target=self._capture_loop, args=(cap,), name='capture', daemon=True),
+            threading.Thread(target=self._inference_loop, name='inference', daemon=True),
+        ]
+        for thread in threads:
+            thread.start()
+
+        # Rendering stays on the calling thread because cv2.imshow is not thread-safe on every platform
+        last_report = time.perf_counter()
+        try:
+            while not self.stop_event.is_set():
+                item = self.results.get(timeout=0.1)
+                if item is None and self.results.closed:
+                    break
+                if item is not None:
+                    _, captured_at, frame, detections = item
+                    if self.display:
+                        cv2.imshow('Frame', draw_detections(frame, detections))
+                    self.stats.tick('render')
+                    self.stats.latency(captured_at)
+                if self.display and cv2.waitKey(1) & 0xFF == ord('q'):
+                    break
+                if time.perf_counter() - last_report >= self.report_every:
+                    print(self.report())
+                    last_report = time.perf_counter()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop_event.set()
+            self.frames.close()
+            for thread in threads:
+                thread.join(timeout=2)
+            cap.release()
+            if self.display:
+                cv2.destroyAllWindows()
+        print(f"Final: {self.report()}")
+
+    def report(self):
+        line = f"{self.stats.summary()} | dropped {self.frames.dropped}"
+        detector_summary = self.detector.summary()
+        return f"{line} | {detector_summary}" if detector_summary else line
+
+
+def parse_source(value):
+    # A bare integer is a camera index, anything else a file path or stream URL
+    return int(value) if value.isdigit() else value
+
+
+def compare_backends(weights, backends, inputs, frames=32, device='cpu'):
+    """Speed and agreement of each backend against the PyTorch model on the same frames."""
+    sample = []
+    for item in iter_frames(expand_inputs(inputs)):
+        sample.append(item[2])
+        if len(sample) == frames:
+            break
+    if not sample:
+        raise ValueError("No frames to compare")
+
+    baseline = None
+    rows = []
+    for backend in ['torch'] + [b for b in backends if b != 'torch']:
+        start = time.perf_counter()
+        model = load_model(weights, backend)
+        model(sample[0], verbose=False, device=device)  # warmup, also triggers lazy backend init
+        load_s = time.perf_counter() - start
+
+        outputs = []
+        start = time.perf_counter()
+        for frame in sample:
+            outputs.append(result_to_detections(model(frame, verbose=False, device=device)[0]))
+        ms_per_frame = (time.perf_counter() - start) / len(sample) * 1000
+
+        if baseline is None:
+            baseline = outputs
+        ref_total = sum(len(ref) for ref in baseline)
+        det_total = sum(len(det) for det in outputs)
+        ious = [iou for ref, det in zip(baseline, outputs) for iou in match_detections(ref, det)]
+        rows.append({
+            'backend': backend,
+            'load_s': round(load_s, 2),
+            'ms_per_frame': round(ms_per_frame, 1),
+            'recall': round(len(ious) / ref_total, 3) if ref_total else 1.0,
+            'precision': round(len(ious) / det_total, 3) if det_total else 1.0,
+            'mean_iou': round(sum(ious) / len(ious), 3) if ious else 0.0,
+        })
+
+    print(f"{'backend':<14} {'load s':>7} {'ms/frame':>9} {'speedup':>8} {'recall':>7} {'precision':>9} {'mean IoU':>9}")
+    for row in rows:
+        speedup = rows[0]['ms_per_frame'] / row['ms_per_frame'] if row['ms_per_frame'] else 0
+        print(f"{row['backend']:<14} {row['load_s']:>7} {row['ms_per_frame']:>9} {speedup:>7.2f}x "
+              f"{row['recall']:>7} {row['precision']:>9} {row['mean_iou']:>9}")
+    return rows
+
+
+def parse_batch_sizes(value):
+    return [int(v) for v in value.split(',') if v]
+
+
+if __name__ == '__main__':
+    def common_options(defaults):
+        # Subcommands get SUPPRESS defaults, otherwise they would overwrite flags given before the subcommand
+        common = argparse.ArgumentParser(add_help=False)
+        common.add_argument('--model', default='yolov8n.pt' if defaults else argparse.SUPPRESS)
+        common.add_argument('--backend', choices=list(BACKENDS), default='torch' if defaults else argparse.SUPPRESS,
+                            help='inference backend, exported models are cached in .model_cache/')
+        return common
+
+    common = common_options(defaults=False)
+
+    adaptive_options = argparse.ArgumentParser(add_help=False)
+    adaptive_options.add_argument('--adaptive', action='store_true',
+                                  help='motion-gated inference on keyframes only, tracked boxes in between')
+    adaptive_options.add_argument('--detect-every', type=int, default=5, help='keyframe interval (adaptive)')
+    adaptive_options.add_argument('--motion-threshold', type=float, default=0.01,
+                                  help='fraction of changed pixels that counts as motion (adaptive)')
+
+    parser = argparse.ArgumentParser(description='YOLOv8 object detection', parents=[common_options(defaults=True)])
+    subparsers = parser.add_subparsers(dest='command')
+
+    live = subparsers.add_parser('live', parents=[common, adaptive_options], help='real-time detection (default)')
+    live.add_argument('--source', type=parse_source, default=0, help='camera index, video file or stream URL')
+    live.add_argument('--no-display', action='store_true', help='only print stage statistics')
+
+    detect = subparsers.add_parser('detect', parents=[common, adaptive_options], help='headless detection over files, emits NDJSON')
+    detect.add_argument('inputs', nargs='+', help='images, directories or video files')
+    detect.add_argument('--batch-size', type=int, default=8)
+    detect.add_argument('--output', help='NDJSON output file (default: stdout)')
+    detect.add_argument('--device', default='cpu')
+
+    bench = subparsers.add_parser('bench', parents=[common], help='throughput/latency per batch size')
+    bench.add_argument('inputs', nargs='*', default=['bus.jpg'])
+    bench.add_argument('--batch-sizes', type=parse_batch_sizes, default=[1, 2, 4, 8])
+    bench.add_argument('--frames', type=int, default=64)
+    bench.add_argument('--device', default='cpu')
+
+    compare = subparsers.add_parser('compare', parents=[common], help='accuracy/speed of backends vs PyTorch')
+    compare.add_argument('inputs', nargs='*', default=['bus.jpg'])
+    compare.add_argument('--backends', default='onnx,onnx-int8,openvino,openvino-int8',
+                         help='comma separated backends to compare against torch')
+    compare.add_argument('--frames', type=int, default=32)
+    compare.add_argument('--device', default='cpu')
+    args = parser.parse_args()
+
+    if args.command == 'compare':
+        compare_backends(args.model, args.backends.split(','), args.inputs, args.frames, args.device)
+        sys.exit(0)
+
+    # Load the YOLOv8n model, exported backends are reused from the cache after the first run
+    model = load_model(args.model, args.backend)
+    adaptive = None
+    if getattr(args, 'adaptive', False):
+        adaptive = {'detect_every': args.detect_every, 'motion_threshold': args.motion_threshold}
+    if args.command == 'detect':
+        if args.output:
+            with open(args.output, 'w') as f:
+                detect_files(model, args.inputs, args.batch_size, f, args.device, adaptive)
+        else:
+            detect_files(model, args.inputs, args.batch_size, device=args.device, adaptive=adaptive)
+    elif args.command == 'bench':
+        benchmark(model, args.inputs, args.batch_sizes, args.frames, device=args.device)
+    else:
+        # Keeps `python yolo.py` behaving as the original live camera loop
+        source = getattr(args, 'source', 0)
+        display = not getattr(args, 'no_display', False)
+        detector = AdaptiveDetector(model, **adaptive) if adaptive else FrameDetector(model)
+        DetectionPipeline(detector, source=source, display=display).run()
@@ -0,0 +1,105 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+
+from ultralytics import YOLO
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.model_cache')
+
+# backend name -> ultralytics export format and whether the artifact is INT8 quantized
+BACKENDS = {
+    'torch': (None, False),
+    'onnx': ('onnx', False),
+    'onnx-int8': ('onnx', True),
+    'openvino': ('openvino', False),
+    'openvino-int8': ('openvino', True),
+}
+
+
+def file_digest(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def cache_key(weights_path, backend, imgsz):
+    import ultralytics
+    # Re-export whenever the weights, the export settings or the exporter itself change
+    payload = json.dumps({
+        'weights': file_digest(weights_path),
+        'backend': backend,
+        'imgsz': imgsz,
+        'ultralytics': ultralytics.__version__,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def quantize_onnx(src, dst):
+    # ultralytics has no INT8 ONNX export, onnxruntime's dynamic quantization needs no calibration data
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    quantize_dynamic(src, dst, weight_type=QuantType.QUInt8)
+
+
+def export_model(model, backend, imgsz, entry_dir):
+    export_format, int8 = BACKENDS[backend]
+    print(f"Exporting {backend} model, this only happens once per weights file...")
+    start = time.perf_counter()
+    os.makedirs(entry_dir, exist_ok=True)
+    if export_format == 'onnx':
+        # Dynamic axes so the headless mode can send multi-image batches
+        exported = model.export(format='onnx', imgsz=imgsz, dynamic=True, simplify=True)
+        artifact = os.path.join(entry_dir, 'model.onnx')
+        if int8:
+            quantize_onnx(exported, artifact)
+            os.remove(exported)
+        else:
+            shutil.move(exported, artifact)
+    else:
+        exported = model.export(format='openvino', imgsz=imgsz, dynamic=True, int8=int8)
+        artifact = os.path.join(entry_dir, 'model_openvino_model')
+        shutil.move(exported, artifact)
+    print(f"Exported {backend} model to {artifact} in {time.perf_counter() - start:.1f}s")
+    return artifact
+
+
+def find_artifact(entry_dir):
+    if not os.path.isdir(entry_dir):
+        return None
+    for name in ('model.onnx', 'model_openvino_model'):
+        path = os.path.join(entry_dir, name)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def load_model(weights='yolov8n.pt', backend='torch', imgsz=640, cache_dir=CACHE_DIR):
+    """Return a YOLO model for the requested backend, exporting and caching it on first use."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}', expected one of {', '.join(BACKENDS)}")
+    if backend == 'torch':
+        return YOLO(weights)
+
+    model = None
+    if os.path.isfile(weights):
+        weights_path = weights
+    else:
+        # YOLO() downloads missing official weights, ckpt_path points at the local copy
+        model = YOLO(weights)
+        weights_path = model.ckpt_path or weights
+    stem = os.path.splitext(os.path.basename(weights_path))[0]
+    entry_dir = os.path.join(cache_dir, f"{stem}-{backend}-{cache_key(weights_path, backend, imgsz)}")
+    artifact = find_artifact(entry_dir)
+    if artifact is None:
+        try:
+            # The PyTorch model is only loaded when there is something to export
+            artifact = export_model(model or YOLO(weights_path), backend, imgsz, entry_dir)
+        except Exception:
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            raise
+    else:
+        print(f"Using cached {backend} model {artifact}")
+    return YOLO(artifact, task='detect')